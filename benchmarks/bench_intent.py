@@ -0,0 +1,87 @@
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.vector_store import LawVectorStore
+from src.intent_classifier import IntentClassifier
+
+EVAL_SET_PATH = Path(__file__).parent / "intent_eval.json"
+THRESHOLDS = (0.0, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+def agreement(predictions: List[Dict[str, Any]], references: List[Dict[str, Any]], field: str) -> float:
+    return float(np.mean([prediction[field] == reference[field] for prediction, reference in zip(predictions, references)]))
+
+def load_llm_agent(provider: str):
+    """Agente cuyo analyze_intent_llm sirve de referencia"""
+    if provider == "claude":
+        from src.claude_agent import ClaudeAgent
+        return ClaudeAgent()
+    from src.openai_agent import OpenAIAgent
+    return OpenAIAgent()
+
+def main():
+    """Exactitud del clasificador local frente a las etiquetas y, con --llm, su acuerdo con el clasificador LLM"""
+    parser = argparse.ArgumentParser(description="Evaluación del clasificador de intención local")
+    parser.add_argument("--llm", choices=("claude", "openai"), help="Comparar también con analyze_intent del LLM")
+    args = parser.parse_args()
+
+    logger.remove()
+    with open(EVAL_SET_PATH, 'r', encoding='utf-8') as f:
+        labeled = json.load(f)
+    queries = [item['query'] for item in labeled]
+
+    classifier = IntentClassifier(LawVectorStore())
+    start = time.perf_counter()
+    classifier.centroids
+    build_seconds = time.perf_counter() - start
+
+    local, confidences, latencies = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        intent_analysis, confidence = classifier.predict(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        local.append(intent_analysis)
+        confidences.append(confidence)
+
+    print(f"Conjunto de evaluación: {len(labeled)} consultas, {len(classifier.examples)} ejemplos de entrenamiento (centroides en {build_seconds:.2f}s)")
+    print(f"Local: tipo {agreement(local, labeled, 'type'):.3f}, especificidad {agreement(local, labeled, 'specificity'):.3f}, "
+          f"latencia p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+
+    reference, reference_name = labeled, "etiquetas"
+    if args.llm:
+        agent = load_llm_agent(args.llm)
+        llm, llm_latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            llm.append(agent.analyze_intent_llm(query))
+            llm_latencies.append((time.perf_counter() - start) * 1000)
+        print(f"LLM ({args.llm}): tipo {agreement(llm, labeled, 'type'):.3f}, especificidad {agreement(llm, labeled, 'specificity'):.3f}, "
+              f"latencia p50 {np.percentile(llm_latencies, 50):.0f} ms")
+        print(f"Acuerdo local/LLM: tipo {agreement(local, llm, 'type'):.3f}, especificidad {agreement(local, llm, 'specificity'):.3f}")
+        reference, reference_name = llm, f"LLM ({args.llm})"
+
+    # Con cada umbral: consultas resueltas localmente y acuerdo del tipo en ellas
+    print(f"\n{'umbral':>7} {'local':>7} {'acuerdo tipo':>13}   (referencia: {reference_name})")
+    for threshold in THRESHOLDS:
+        covered = [i for i, confidence in enumerate(confidences) if confidence >= threshold]
+        accuracy = agreement([local[i] for i in covered], [reference[i] for i in covered], 'type') if covered else float('nan')
+        marker = " <- INTENT_MIN_CONFIDENCE" if threshold == settings.INTENT_MIN_CONFIDENCE else ""
+        print(f"{threshold:>7.2f} {len(covered) / len(queries):>7.0%} {accuracy:>13.3f}{marker}")
+
+    mistakes = [(item, prediction) for item, prediction in zip(labeled, local) if item['type'] != prediction['type']]
+    if mistakes:
+        print("\nErrores de tipo:")
+        for item, prediction in mistakes:
+            print(f"  {item['query']!r}: {prediction['type']} (esperado {item['type']})")
+
+if __name__ == "__main__":
+    main()
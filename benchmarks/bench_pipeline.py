@@ -0,0 +1,63 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+GOLDEN_SET_PATH = Path(__file__).parent / "golden_set.json"
+STAGES = ("intent", "retrieval", "intent_and_retrieval", "search", "generation", "critical_path_saved")
+
+def load_agent(provider: str):
+    if provider == "claude":
+        from src.claude_agent import ClaudeAgent
+        return ClaudeAgent()
+    from src.openai_agent import OpenAIAgent
+    return OpenAIAgent()
+
+def run(agent, questions: List[str]) -> List[Dict[str, Any]]:
+    """Tiempos por etapa de cada consulta, sin cachés de respuestas entre corridas"""
+    agent.vector_store.query_cache.clear()
+    return [{**result.timings, "total": result.processing_time} for result in map(agent.process_query, questions)]
+
+def main():
+    """Etapas de process_query en secuencia y con la búsqueda inicial en paralelo al análisis de intención"""
+    parser = argparse.ArgumentParser(description="Tiempos por etapa del agente")
+    parser.add_argument("--llm", choices=("claude", "openai"), default="claude")
+    parser.add_argument("--intent", choices=("local", "llm"), default=settings.INTENT_CLASSIFIER,
+                        help="Clasificador de intención (con llm el análisis es una llamada a la API)")
+    parser.add_argument("--limit", type=int, default=10, help="Preguntas del conjunto de referencia")
+    args = parser.parse_args()
+
+    logger.remove()
+    settings.INTENT_CLASSIFIER = args.intent
+    with open(GOLDEN_SET_PATH, 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f)][:args.limit]
+
+    agent = load_agent(args.llm)
+    agent.vector_store.warmup()
+
+    results = {}
+    for concurrent in (False, True):
+        settings.CONCURRENT_RETRIEVAL = concurrent
+        results["paralelo" if concurrent else "secuencial"] = run(agent, questions)
+
+    print(f"{len(questions)} preguntas, agente {args.llm}, intención {args.intent} (p50 en ms)")
+    print(f"{'pipeline':>11} " + " ".join(f"{stage:>20}" for stage in STAGES) + f" {'total':>9}")
+    for name, timings in results.items():
+        cells = [np.median([t.get(stage, 0.0) for t in timings]) * 1000 for stage in STAGES]
+        total = np.median([t["total"] for t in timings]) * 1000
+        print(f"{name:>11} " + " ".join(f"{cell:>20.1f}" for cell in cells) + f" {total:>9.1f}")
+
+    sequential = np.median([t["total"] for t in results["secuencial"]])
+    concurrent = np.median([t["total"] for t in results["paralelo"]])
+    print(f"Reducción del camino crítico: {(sequential - concurrent) * 1000:.1f} ms ({1 - concurrent / sequential:.1%})")
+
+if __name__ == "__main__":
+    main()
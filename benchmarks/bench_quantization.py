@@ -0,0 +1,98 @@
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.index_artifact import IndexArtifact
+from src.quantization import QUANTIZATION_MODES
+from src.vector_store import NumpyBackend
+from benchmarks.bench_retrieval import synthetic_embeddings, recall, DIMENSIONS, N_RESULTS
+
+QUERIES = 300
+
+# Preguntas reales de usuarios para medir sobre el corpus de la ley
+QUESTIONS = [
+    "¿Cuántas semanas necesito para pensionarme?",
+    "¿Qué es el pilar solidario?",
+    "¿Cuál es la edad de pensión para mujeres?",
+    "¿Qué pasa con mis aportes en un fondo privado?",
+    "¿Cómo funciona el pilar contributivo?",
+    "¿Quién administra el componente de prima media?",
+    "¿Qué es la renta básica solidaria?",
+    "¿Cuál es el umbral de cotización en salarios mínimos?",
+    "¿Qué beneficios tienen las madres con hijos?",
+    "¿Cómo se calcula la pensión de vejez?",
+    "¿Qué es el régimen de transición?",
+    "¿Cuándo entra en vigencia la reforma pensional?",
+    "¿Qué es el pilar semicontributivo?",
+    "¿Qué pasa si no completo las semanas mínimas?",
+    "¿Qué funciones tiene Colpensiones?",
+    "¿Cómo se financia el pilar solidario?",
+    "¿Qué es la pensión de invalidez?",
+    "¿Quiénes tienen derecho a la pensión de sobrevivientes?",
+    "¿Puedo trasladarme entre regímenes?",
+    "¿Qué es el fondo de ahorro del pilar contributivo?",
+]
+
+def corpus_embeddings() -> Tuple[np.ndarray, np.ndarray]:
+    """Embeddings del artefacto de índice y de las preguntas, con el modelo del proyecto"""
+    from sentence_transformers import SentenceTransformer
+
+    with IndexArtifact(settings.INDEX_ARTIFACT_PATH) as artifact:
+        embeddings = np.array(artifact.embeddings)
+    queries = SentenceTransformer(settings.EMBEDDING_MODEL).encode(QUESTIONS, show_progress_bar=False)
+    return embeddings, np.asarray(queries, dtype=np.float32)
+
+def measure(backend: NumpyBackend, queries: np.ndarray) -> Tuple[List[float], List[List[str]]]:
+    """Latencias por consulta individual (ms) y los IDs recuperados"""
+    backend.query(queries[:1].tolist(), N_RESULTS)  # Calentamiento (y consolidación de la matriz)
+    latencies = []
+    retrieved = []
+    for query in queries.tolist():
+        start = time.perf_counter()
+        results = backend.query([query], N_RESULTS)
+        latencies.append((time.perf_counter() - start) * 1000)
+        retrieved.append(results['ids'][0])
+    return latencies, retrieved
+
+def main():
+    """Memoria de embeddings, latencia p50/p99 y recall@k de cada modo de cuantización frente a float32"""
+    logger.remove()
+    rng = np.random.default_rng(2381)
+
+    datasets = []
+    if settings.INDEX_ARTIFACT_PATH.exists():
+        datasets.append(("ley", *corpus_embeddings()))
+    else:
+        print(f"⚠️  Sin artefacto de índice ({settings.INDEX_ARTIFACT_PATH}): ejecuta python -m src.index_artifact para medir sobre el corpus")
+
+    for size in (10_000, 100_000):
+        embeddings = synthetic_embeddings(size, rng)
+        queries = embeddings[rng.integers(0, size, QUERIES)] + 0.3 * rng.standard_normal((QUERIES, DIMENSIONS)).astype(np.float32)
+        datasets.append((f"{size:,}", embeddings, queries))
+
+    print(f"Lista corta para reordenar: {settings.QUANTIZED_SHORTLIST} candidatos")
+    print(f"{'corpus':>8} {'modo':>7} {'memoria (MB)':>13} {'p50 (ms)':>9} {'p99 (ms)':>9} {f'recall@{N_RESULTS}':>9}")
+    for name, embeddings, queries in datasets:
+        ids = [f"doc_{i}" for i in range(len(embeddings))]
+        exact = None
+        for mode in QUANTIZATION_MODES:
+            backend = NumpyBackend(quantization=mode)
+            backend.add(ids, embeddings, [{} for _ in ids], ["" for _ in ids])
+            latencies, retrieved = measure(backend, queries)
+            if exact is None:
+                exact = retrieved
+
+            print(
+                f"{name:>8} {mode:>7} {backend.embedding_bytes() / 2**20:>13.2f} {np.percentile(latencies, 50):>9.3f} "
+                f"{np.percentile(latencies, 99):>9.3f} {recall(retrieved, exact):>9.3f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.batching_encoder import MicroBatchingEncoder
+from src.query_encoder import AGREEMENT_QUERIES
+
+QUERIES = 400
+WINDOWS_MS = (1, 2, 5, 10)
+
+def load_encoder():
+    """Encoder de consultas configurado en QUERY_ENCODER"""
+    if settings.QUERY_ENCODER == "onnx":
+        from src.query_encoder import OnnxQueryEncoder
+        return OnnxQueryEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+
+def run(encode, users: int, queries):
+    """Envía las consultas desde `users` hilos; retorna consultas/s y latencias (ms)"""
+    def timed(query):
+        start = time.perf_counter()
+        encode([query], show_progress_bar=False)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(users) as executor:
+        latencies = list(executor.map(timed, queries))
+    return len(queries) / (time.perf_counter() - start), latencies
+
+def main():
+    """Rendimiento con usuarios concurrentes, sin agrupar y con micro-lotes de distintas ventanas"""
+    logger.remove()
+    encoder = load_encoder()
+    encoder.encode(["pensión de vejez"], show_progress_bar=False)  # Calentamiento
+
+    # Variantes para que la caché de consultas no influya (el encoder no la usa, pero el texto real varía)
+    queries = [f"{AGREEMENT_QUERIES[i % len(AGREEMENT_QUERIES)]} {i}" for i in range(QUERIES)]
+
+    print(f"Encoder: {settings.QUERY_ENCODER}, lote máximo {settings.QUERY_BATCH_MAX_SIZE}")
+    print(f"{'usuarios':>9} {'ventana':>8} {'consultas/s':>12} {'p50 (ms)':>9} {'p99 (ms)':>9} {'lote medio':>11} {'cola máx.':>10}")
+    for users in (1, 8, 32):
+        throughput, latencies = run(encoder.encode, users, queries)
+        print(f"{users:>9} {'-':>8} {throughput:>12.0f} {np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 99):>9.2f} {1:>11.1f} {'-':>10}")
+
+        for window_ms in WINDOWS_MS:
+            batcher = MicroBatchingEncoder(encoder, window_ms=window_ms)
+            throughput, latencies = run(batcher.encode, users, queries)
+            stats = batcher.stats()
+            batcher.close()
+            print(
+                f"{users:>9} {window_ms:>6} ms {throughput:>12.0f} {np.percentile(latencies, 50):>9.2f} "
+                f"{np.percentile(latencies, 99):>9.2f} {stats['mean_batch_size']:>11.1f} {stats['max_queue_depth']:>10}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import sys
+import json
+import time
+import resource
+import subprocess
+from pathlib import Path
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.query_encoder import AGREEMENT_QUERIES
+
+ENCODERS = ("torch", "onnx", "onnx-int8")
+REPETITIONS = 20
+
+def worker(kind: str):
+    """Carga un encoder en este proceso y reporta arranque, latencia, memoria y embeddings en JSON"""
+    start = time.perf_counter()
+    if kind == "torch":
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+    else:
+        from src.query_encoder import OnnxQueryEncoder
+        encoder = OnnxQueryEncoder(quantized=kind == "onnx-int8")
+    load_seconds = time.perf_counter() - start
+
+    encoder.encode(["pensión de vejez"], show_progress_bar=False)  # Calentamiento
+
+    # Una consulta por llamada, como llegan del bot
+    latencies = []
+    for _ in range(REPETITIONS):
+        for query in AGREEMENT_QUERIES:
+            start = time.perf_counter()
+            encoder.encode([query], show_progress_bar=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KB en Linux
+        "torch_loaded": "torch" in sys.modules,
+        "embeddings": np.asarray(encoder.encode(AGREEMENT_QUERIES, show_progress_bar=False)).tolist()
+    }))
+
+def main():
+    """Latencia por consulta individual, memoria y concordancia coseno de los encoders torch y ONNX"""
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        worker(sys.argv[2])
+        return
+
+    if not (settings.ONNX_ENCODER_DIR / "encoder_config.json").exists():
+        print(f"⚠️  Sin encoder ONNX en {settings.ONNX_ENCODER_DIR}: ejecuta primero python -m src.query_encoder")
+        return
+
+    # Cada encoder en un proceso nuevo, para que la memoria y las importaciones no se mezclen
+    results = {}
+    for kind in ENCODERS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", kind], capture_output=True, text=True, check=True
+        ).stdout
+        results[kind] = json.loads(output.strip().splitlines()[-1])
+
+    reference = np.array(results["torch"]["embeddings"])
+    print(f"{'encoder':>10} {'carga (s)':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'RSS (MB)':>9} {'torch':>6} {'coseno mín.':>12}")
+    for kind, result in results.items():
+        embeddings = np.array(result["embeddings"])
+        cosines = (reference * embeddings).sum(axis=1) / (np.linalg.norm(reference, axis=1) * np.linalg.norm(embeddings, axis=1))
+        print(
+            f"{kind:>10} {result['load_seconds']:>10.2f} {result['p50']:>9.2f} {result['p99']:>9.2f} "
+            f"{result['max_rss_mb']:>9.0f} {'sí' if result['torch_loaded'] else 'no':>6} {cosines.min():>12.5f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import sys
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.vector_store import LawVectorStore
+from src.reranker import CrossEncoderReranker
+from src.context_packer import count_tokens
+
+GOLDEN_SET_PATH = Path(__file__).parent / "golden_set.json"
+BASELINE_SIZES = (3, 5, 7)  # n_results del agente según la especificidad
+
+def evaluate(golden: List[Dict[str, Any]], contexts: List[List[Dict[str, Any]]]) -> Dict[str, float]:
+    """Recall de artículos esperados y tamaño del contexto que recibiría el LLM"""
+    any_hits = all_hits = 0
+    for item, context in zip(golden, contexts):
+        found = {result['metadata'].get('article_number') for result in context}
+        expected = set(item['articles'])
+        any_hits += bool(found & expected)
+        all_hits += expected <= found
+    return {
+        "recall_any": any_hits / len(golden),
+        "recall_all": all_hits / len(golden),
+        "chunks": float(np.mean([len(context) for context in contexts])),
+        "tokens": float(np.mean([sum(count_tokens(result['content']) for result in context) for context in contexts]))
+    }
+
+def main():
+    """Tokens de contexto frente a recall de respuesta, con y sin reordenamiento, sobre el conjunto de referencia"""
+    logger.remove()
+    with open(GOLDEN_SET_PATH, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+
+    vector_store = LawVectorStore()
+    reranker = vector_store.reranker or CrossEncoderReranker()
+    questions = [item['question'] for item in golden]
+
+    candidates = [vector_store.search(question, n_results=max(settings.RERANK_CANDIDATES, *BASELINE_SIZES)) for question in questions]
+
+    results = {f"bi-encoder top {n}": evaluate(golden, [ranking[:n] for ranking in candidates]) for n in BASELINE_SIZES}
+
+    latencies = {}
+    for run in ("frío", "caché"):
+        reranked = []
+        times = []
+        for question, ranking in zip(questions, candidates):
+            start = time.perf_counter()
+            reranked.append(reranker.rerank(question, ranking[:settings.RERANK_CANDIDATES]))
+            times.append((time.perf_counter() - start) * 1000)
+        latencies[run] = float(np.percentile(times, 50))
+    results[f"rerank {settings.RERANK_CANDIDATES}→{settings.RERANK_TOP_K}"] = evaluate(golden, reranked)
+
+    baseline_tokens = results["bi-encoder top 5"]["tokens"]
+    print(f"Conjunto de referencia: {len(golden)} preguntas, cross-encoder {reranker.model_name}")
+    print(f"{'estrategia':>22} {'recall (alguno)':>16} {'recall (todos)':>15} {'fragmentos':>11} {'tokens':>7} {'vs top 5':>9}")
+    for name, metrics in results.items():
+        print(
+            f"{name:>22} {metrics['recall_any']:>16.3f} {metrics['recall_all']:>15.3f} {metrics['chunks']:>11.1f} "
+            f"{metrics['tokens']:>7.0f} {metrics['tokens'] / baseline_tokens - 1:>+9.0%}"
+        )
+    print(f"Latencia del reordenamiento (p50): {latencies['frío']:.1f} ms en frío, {latencies['caché']:.2f} ms con caché")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict
+import numpy as np
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.corpus_store import CompactCorpus
+from src.chunker import ArticleChunker
+from src.vector_store import RetrievalBackend, ChromaBackend, NumpyBackend, COLLECTION_METADATA
+
+DIMENSIONS = 384  # paraphrase-multilingual-MiniLM-L12-v2
+N_RESULTS = 5
+QUERIES = 300
+
+def current_corpus_size() -> int:
+    """Documentos que indexa hoy el vector store: fragmentos de artículos más secciones"""
+    with CompactCorpus(settings.CORPUS_PATH) as corpus:
+        articles = list(corpus.iter_records("article"))
+        sections = len(corpus) - len(articles)
+    return len(ArticleChunker().chunk_articles(articles)) + sections
+
+def synthetic_embeddings(size: int, rng: np.random.Generator) -> np.ndarray:
+    """Embeddings agrupados en temas, como los de una ley dividida en capítulos"""
+    centers = rng.standard_normal((max(size // 50, 1), DIMENSIONS)).astype(np.float32)
+    topics = rng.integers(0, len(centers), size)
+    return centers[topics] + 0.6 * rng.standard_normal((size, DIMENSIONS)).astype(np.float32)
+
+def fill(backend: RetrievalBackend, embeddings: np.ndarray, batch_size: int = 5000):
+    for start in range(0, len(embeddings), batch_size):
+        batch = embeddings[start:start + batch_size]
+        ids = [f"doc_{start + i}" for i in range(len(batch))]
+        backend.add(ids, batch.tolist(), [{"type": "chunk"} for _ in ids], [f"documento {doc_id}" for doc_id in ids])
+
+def measure(backend: RetrievalBackend, queries: np.ndarray) -> Dict[str, object]:
+    """Latencias por consulta individual (ms) y los IDs recuperados"""
+    backend.query(queries[:1].tolist(), N_RESULTS)  # Calentamiento
+    latencies = []
+    retrieved = []
+    for query in queries.tolist():
+        start = time.perf_counter()
+        results = backend.query([query], N_RESULTS)
+        latencies.append((time.perf_counter() - start) * 1000)
+        retrieved.append(results['ids'][0])
+    return {
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "ids": retrieved
+    }
+
+def recall(retrieved: List[List[str]], exact: List[List[str]]) -> float:
+    """Fracción de los vecinos exactos que recupera el motor aproximado"""
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(retrieved, exact))
+    return hits / sum(len(expected) for expected in exact)
+
+def main():
+    """Latencia p50/p99 de los motores Chroma (HNSW) y NumPy (exacto) según el tamaño del corpus"""
+    logger.remove()
+    rng = np.random.default_rng(2381)
+    client = chromadb.EphemeralClient(settings=ChromaSettings(anonymized_telemetry=False, allow_reset=True))
+
+    print(f"{'documentos':>11} {'motor':>7} {'carga (s)':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {f'recall@{N_RESULTS}':>9}")
+    for size in (current_corpus_size(), 10_000, 100_000):
+        embeddings = synthetic_embeddings(size, rng)
+        queries = embeddings[rng.integers(0, size, QUERIES)] + 0.3 * rng.standard_normal((QUERIES, DIMENSIONS)).astype(np.float32)
+
+        # Misma distancia coseno que la colección de producción: el recall mide solo la aproximación de HNSW
+        collection = client.create_collection(name=f"bench_{size}", metadata=COLLECTION_METADATA, embedding_function=None)
+        backends = [NumpyBackend(), ChromaBackend(lambda: collection)]
+
+        exact = None
+        for backend in backends:
+            start = time.perf_counter()
+            fill(backend, embeddings)
+            load_seconds = time.perf_counter() - start
+
+            result = measure(backend, queries)
+            if exact is None:
+                exact = result["ids"]
+
+            print(
+                f"{size:>11,} {backend.name:>7} {load_seconds:>10.2f} {result['p50']:>9.3f} "
+                f"{result['p99']:>9.3f} {recall(result['ids'], exact):>9.3f}"
+            )
+
+        client.delete_collection(f"bench_{size}")
+
+if __name__ == "__main__":
+    main()
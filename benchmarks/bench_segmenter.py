@@ -0,0 +1,90 @@
+import re
+import sys
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Tuple
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.law_segmenter import LawSegmenter
+
+ROMAN = [(10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+
+def to_roman(number: int) -> str:
+    result = ""
+    for value, symbol in ROMAN:
+        while number >= value:
+            result += symbol
+            number -= value
+    return result
+
+def legacy_segment(text: str) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """Segmentador anterior: tres búsquedas con expresiones perezosas DOTALL sobre todo el texto"""
+    raw_articles = []
+    for match in re.finditer(r'ARTÍCULO\s+(\d+)\.?\s*(.*?)(?=ARTÍCULO\s+\d+|$)', text, re.DOTALL | re.IGNORECASE):
+        content = re.sub(r'\s+', ' ', re.sub(r'\n+', ' ', match.group(2).strip()))
+        raw_articles.append({"article_number": match.group(1), "content": content})
+
+    raw_sections = []
+    patterns = [
+        (r'CAPÍTULO\s+([IVX\d]+)\.?\s*(.*?)(?=CAPÍTULO|ARTÍCULO|$)', "chapter"),
+        (r'TÍTULO\s+([IVX\d]+)\.?\s*(.*?)(?=TÍTULO|CAPÍTULO|ARTÍCULO|$)', "title"),
+    ]
+    for pattern, section_type in patterns:
+        for match in re.finditer(pattern, text, re.DOTALL | re.IGNORECASE):
+            content = re.sub(r'\s+', ' ', re.sub(r'\n+', ' ', match.group(2).strip()))
+            raw_sections.append({"section_number": match.group(1), "content": content, "type": section_type})
+
+    return raw_articles, raw_sections
+
+def build_synthetic_law(scale: int) -> str:
+    """Construye una ley sintética `scale` veces más grande a partir de processed_law.json"""
+    with open(settings.PROCESSED_DATA_DIR / "processed_law.json", 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    parts = []
+    article_number = 1
+    for copy in range(scale):
+        parts.append(f"TÍTULO {to_roman(copy + 1)}.\nDISPOSICIONES DEL LIBRO {copy + 1}\n")
+        for chapter_index, section in enumerate(data["sections"]):
+            parts.append(f"CAPÍTULO {to_roman(chapter_index + 1)}.\n{section['content']}\n")
+            for article in data["articles"][chapter_index * 7:(chapter_index + 1) * 7]:
+                parts.append(f"ARTÍCULO {article_number}. {article['content']}\n")
+                article_number += 1
+
+    return "".join(parts)
+
+def measure(function, text: str, repeats: int) -> float:
+    """Mejor tiempo de `repeats` ejecuciones, en segundos"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    """Compara el segmentador de una pasada con el anterior en leyes sintéticas"""
+    logger.remove()
+    segmenter = LawSegmenter()
+
+    print(f"{'escala':>7} {'caracteres':>12} {'anterior (ms)':>14} {'una pasada (ms)':>16} {'aceleración':>12}")
+    for scale in (1, 10, 100):
+        text = build_synthetic_law(scale)
+        repeats = 5 if scale < 100 else 2
+
+        # Verificar que ambos segmentadores producen el mismo contenido crudo
+        legacy_articles, _ = legacy_segment(text)
+        new_articles = [s for s in segmenter.segment_block(text) if s["type"] == "article"]
+        assert [a["content"] for a in legacy_articles] == [a["content"] for a in new_articles]
+
+        legacy_time = measure(legacy_segment, text, repeats)
+        new_time = measure(segmenter.segment, text, repeats)
+        print(f"{scale:>6}x {len(text):>12,} {legacy_time * 1000:>14.1f} {new_time * 1000:>16.1f} {legacy_time / new_time:>11.1f}x")
+
+if __name__ == "__main__":
+    main()
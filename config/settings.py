@@ -23,10 +23,66 @@ class Settings:
     # Configuración del vector store
     VECTOR_DB_PATH = PROCESSED_DATA_DIR / "vector_db"
     EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))  # Segundos
+    QUERY_ENCODER = os.getenv("QUERY_ENCODER", "torch").lower()  # torch | onnx (solo consultas; los documentos se indexan con torch)
+    ONNX_ENCODER_DIR = Path(os.getenv("ONNX_ENCODER_DIR", str(PROCESSED_DATA_DIR / "onnx_encoder")))  # python -m src.query_encoder
+    ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"  # Variante int8 con cuantización dinámica
+    ONNX_MIN_AGREEMENT = float(os.getenv("ONNX_MIN_AGREEMENT", "0.98"))  # Coseno mínimo con torch al exportar
+    QUERY_BATCHING = os.getenv("QUERY_BATCHING", "false").lower() == "true"  # Agrupa en un lote las consultas concurrentes
+    QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))  # Espera máxima por más consultas
+    QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))  # Documentos en vuelo entre etapas
+    RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma").lower()  # chroma | numpy (búsqueda exacta en memoria) | artifact
+    INDEX_ARTIFACT_PATH = Path(os.getenv("INDEX_ARTIFACT_PATH", str(PROCESSED_DATA_DIR / "law_index.artifact")))  # python -m src.index_artifact
+    INDEX_ARTIFACT_VERIFY = os.getenv("INDEX_ARTIFACT_VERIFY", "true").lower() == "true"  # Checksum al abrir
+    EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "none").lower()  # none | int8 | binary (motores numpy y artifact)
+    QUANTIZED_SHORTLIST = int(os.getenv("QUANTIZED_SHORTLIST", "50"))  # Candidatos que se reordenan con los embeddings float
+    INDEX_STATS_PATH = PROCESSED_DATA_DIR / "index_stats.json"  # Instantánea de estadísticas, se reescribe al indexar
+    LIGHTWEIGHT_MODE = os.getenv("LIGHTWEIGHT_MODE", "false").lower() == "true"  # Solo consulta de artículos, sin modelo
+    
+    # Búsqueda híbrida: BM25 + densa, combinadas con reciprocal rank fusion
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid").lower()  # dense | hybrid
+    BM25_INDEX_PATH = PROCESSED_DATA_DIR / "bm25_index.npz"
+    BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+    BM25_B = float(os.getenv("BM25_B", "0.75"))
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Profundidad de cada ranking antes de fusionar
+    
+    # Reordenamiento con cross-encoder de una lista acotada de candidatos
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")  # Multilingüe
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "12"))  # Candidatos que evalúa el cross-encoder
+    RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))  # Fragmentos que se envían al LLM
+    RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "0.3"))  # Confianza mínima (siempre se conserva el mejor)
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "4096"))  # Pares (consulta, documento)
+    
+    # Presupuesto de tokens del contexto que recibe el LLM (fragmentos en orden de relevancia)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "chars").lower()  # chars (caracteres / 4) | codificación de tiktoken, p. ej. cl100k_base (pip install tiktoken)
+    
+    # Clasificación de intención local (centroides de ejemplos etiquetados); el LLM solo si la confianza es baja.
+    # Opcional hasta calibrar umbral y temperatura con benchmarks/bench_intent.py --llm sobre el modelo real
+    INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "llm").lower()  # llm | local
+    INTENT_EXAMPLES_PATH = DATA_DIR / "intent_examples.json"
+    INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.6"))
+    INTENT_TEMPERATURE = float(os.getenv("INTENT_TEMPERATURE", "0.05"))  # Softmax sobre similitudes coseno
+    CONCURRENT_RETRIEVAL = os.getenv("CONCURRENT_RETRIEVAL", "true").lower() == "true"  # Buscar la consulta mientras se analiza la intención
+    
+    # Fragmentación de artículos en parágrafos, numerales y literales (requiere reindexar;
+    # el vector_db incluido tiene un documento por artículo)
+    CHUNKING_ENABLED = os.getenv("CHUNKING_ENABLED", "false").lower() == "true"
+    CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "800"))
+    CHUNK_OVERLAP_CHARS = int(os.getenv("CHUNK_OVERLAP_CHARS", "120"))
     
     # Configuración del bot
     MAX_MESSAGE_LENGTH = 4096  # Límite de Telegram
-    CACHE_SIZE = 100
+    CACHE_SIZE = int(os.getenv("CACHE_SIZE", "100"))  # Respuestas en la caché del agente
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))  # Segundos
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))  # Coseno mínimo para reutilizar una respuesta (>1 desactiva)
+    TELEGRAM_STREAMING = os.getenv("TELEGRAM_STREAMING", "true").lower() == "true"  # Editar la respuesta a medida que se genera
+    TELEGRAM_EDIT_INTERVAL = float(os.getenv("TELEGRAM_EDIT_INTERVAL", "1.0"))  # Segundos mínimos entre ediciones del mismo mensaje
     
     # Configuración MCP Server
     MCP_HOST = "localhost"
@@ -34,6 +90,20 @@ class Settings:
     
     # Archivo de la ley
     LAW_PDF_PATH = DATA_DIR / "ley_2381_2024.pdf"
+    PRIMARY_SOURCE = LAW_PDF_PATH.stem  # Sus documentos conservan IDs sin prefijo
+    
+    # Ingesta por lotes (ley, decretos reglamentarios y normas relacionadas)
+    LAWS_DIR = Path(os.getenv("LAWS_DIR", str(DATA_DIR)))
+    SOURCES_DIR = PROCESSED_DATA_DIR / "sources"  # Salida y caché por fuente
+    COMBINED_CORPUS_JSON = PROCESSED_DATA_DIR / "combined_corpus.json"
+    COMBINED_CORPUS_PATH = PROCESSED_DATA_DIR / "combined_corpus.corpus"
+    INDEX_CORPUS = os.getenv("INDEX_CORPUS", "law").lower()  # law (processed_law) | combined (todas las normas de batch_ingest)
+    
+    # Extracción del PDF
+    PDF_PARALLEL_EXTRACTION = os.getenv("PDF_PARALLEL_EXTRACTION", "false").lower() == "true"
+    PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "0"))  # 0 = os.cpu_count()
+    EXTRACTION_CACHE_PATH = PROCESSED_DATA_DIR / "extraction_cache.json"
+    CORPUS_PATH = PROCESSED_DATA_DIR / "processed_law.corpus"  # Formato compacto mapeable en memoria
     
     def __init__(self):
         # Crear directorios si no existen
@@ -0,0 +1,122 @@
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, NamedTuple
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.cache import LRUCache, normalize_query
+
+NUMBER_PATTERN = re.compile(r'\d+')
+
+class _Entry(NamedTuple):
+    result: Any
+    embedding: Optional[np.ndarray]
+    numbers: Tuple[str, ...]
+
+class AnswerCache:
+    """Caché de respuestas del agente delante de process_query.
+
+    Una consulta se reutiliza si su texto normalizado ya está en la caché o, si no,
+    si el embedding de una consulta cacheada tiene similitud coseno de al menos
+    ANSWER_CACHE_SIMILARITY y ambas citan los mismos números ("artículo 12" y
+    "artículo 13" son casi idénticas para el modelo, pero no son la misma pregunta).
+    Expulsión LRU con TTL, hasta CACHE_SIZE respuestas; se vacía cuando cambia el
+    hash del corpus indexado.
+    """
+
+    def __init__(self, vector_store, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 similarity: Optional[float] = None):
+        self.vector_store = vector_store
+        self.entries = LRUCache(
+            settings.CACHE_SIZE if max_size is None else max_size,
+            settings.ANSWER_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        )
+        self.similarity = settings.ANSWER_CACHE_SIMILARITY if similarity is None else similarity
+        self.corpus_hash = vector_store.index_stats.get('corpus_hash')
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_corpus(self):
+        """Descarta las respuestas si el corpus indexado cambió desde que se guardaron"""
+        current = self.vector_store.index_stats.get('corpus_hash')
+        with self._lock:
+            if current == self.corpus_hash:
+                return
+            self.corpus_hash = current
+            self.invalidations += 1
+        self.entries.clear()
+        logger.info("Corpus actualizado: caché de respuestas vaciada")
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        """Embedding normalizado de la consulta (el mismo que usa la búsqueda), o None sin comparación semántica"""
+        if self.similarity > 1 or self.vector_store.lightweight:
+            return None
+        embedding = np.asarray(self.vector_store.embed_query(query), dtype=np.float32)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, query: str) -> Optional[Tuple[Any, str]]:
+        """(resultado cacheado, "exact" | "semantic") o None"""
+        self._check_corpus()
+        key = normalize_query(query)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._count("exact_hits")
+            return entry.result, "exact"
+
+        embedding = self._embed(query)
+        if embedding is not None:
+            numbers = tuple(sorted(set(NUMBER_PATTERN.findall(key))))
+            best_key, best_score = None, self.similarity
+            for other_key, other in self.entries.items():
+                if other.embedding is None or other.numbers != numbers:
+                    continue
+                score = float(other.embedding @ embedding)
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+
+            # get() la marca como usada recientemente (y falla si expiró entretanto)
+            entry = self.entries.get(best_key) if best_key is not None else None
+            if entry is not None:
+                self._count("semantic_hits")
+                logger.info(f"Respuesta cacheada para una consulta similar ({best_score:.3f}): '{best_key}'")
+                return entry.result, "semantic"
+
+        self._count("misses")
+        return None
+
+    def put(self, query: str, result: Any):
+        self._check_corpus()
+        key = normalize_query(query)
+        numbers = tuple(sorted(set(NUMBER_PATTERN.findall(key))))
+        self.entries.put(key, _Entry(result, self._embed(query), numbers))
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.entries.max_size,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "invalidations": self.invalidations
+            }
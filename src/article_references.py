@@ -0,0 +1,150 @@
+import re
+import sys
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.sparse_index import tokenize
+
+MAX_REFERENCED_ARTICLES = 20  # Tope para rangos como "artículos 1 a 500"
+
+# "artículo 15", "art. 23", "arts 3-5", "artículos 10 a 15", "artículos 3, 5 y 7", "de los artículos 10 al 12"
+REFERENCE_PATTERN = re.compile(
+    r'\b(?P<keyword>art[íi]culos?|arts?)\.?\s*'
+    r'(?P<numbers>\d{1,4}(?:\s*(?:,|y|e|a|al|hasta|-|–)\s*(?:(?:el|del|los)\s+)?\d{1,4})*)',
+    re.IGNORECASE
+)
+PART_PATTERN = re.compile(r'\d{1,4}|\b(?:al|a|hasta)\b|[-–]', re.IGNORECASE)
+RANGE_WORDS = {"a", "al", "hasta", "-", "–"}
+# Solo el plural admite rangos: en "el artículo 36 a 62 años" el 62 no es un artículo
+PLURAL_KEYWORDS = {"artículos", "articulos", "arts"}
+
+# Un número seguido de una unidad es una cantidad, no un artículo ("artículos 36 a 62 años")
+UNIT_PATTERN = re.compile(
+    r'\s*(?:%|por\s+ciento\b|años?\b|semanas?\b|mes(?:es)?\b|d[íi]as?\b|salarios?\b|smmlv\b|puntos?\b|veces\b)',
+    re.IGNORECASE
+)
+
+# Otra norma citada por número ("Ley 100 de 1993", "Decreto 1833") o por nombre: sus
+# artículos no son los de la Ley 2381
+OTHER_NORM_PATTERN = re.compile(
+    r'\b(?:ley|decreto|resoluci[óo]n|acuerdo)\s+(?:n[°º.o]*\s*)?(?P<number>\d+(?:\.\d+)?)|\bc[óo]digo\b|\bconstituci[óo]n\b',
+    re.IGNORECASE
+)
+
+# Palabras que acompañan a una referencia sin cambiar lo que se pide: ver el texto del artículo
+LOOKUP_WORDS = frozenset(
+    "muestrame muestra mostrar mostrarme ver veo dame quiero necesito consultar consulta buscar busca "
+    "texto contenido completo completos dice dicen cual cuales ley 2381 2024 favor me puedes podrias "
+    "leer lee enviame envia trae traeme".split()
+)
+
+def names_other_norm(text: str) -> bool:
+    """True si la consulta cita una norma distinta de la Ley 2381"""
+    return any(match.group('number') != "2381" for match in OTHER_NORM_PATTERN.finditer(text))
+
+def parse_article_references(text: str) -> List[str]:
+    """Números de artículo de la Ley 2381 citados en el texto, en orden y sin repetir (los rangos se expanden).
+
+    Vacío si la consulta cita otra norma: "artículo 33 de la Ley 100" no es el artículo 33 de esta ley.
+    """
+    if names_other_norm(text):
+        return []
+
+    numbers: List[int] = []
+    for match in REFERENCE_PATTERN.finditer(text):
+        plural = match.group('keyword').lower() in PLURAL_KEYWORDS
+        parts = []
+        for part in PART_PATTERN.finditer(match.group('numbers')):
+            if part.group().isdigit() and UNIT_PATTERN.match(text, match.start('numbers') + part.end()):
+                break  # Ni este número ni los siguientes son artículos
+            parts.append(part.group().lower())
+
+        position = 0
+        while position < len(parts):
+            start = int(parts[position])
+            if plural and position + 2 < len(parts) and parts[position + 1] in RANGE_WORDS and parts[position + 2].isdigit():
+                end = int(parts[position + 2])
+                numbers.extend(range(start, end + 1) if start <= end else [start, end])
+                position += 3
+            else:
+                numbers.append(start)
+                position += 1
+                if position < len(parts) and parts[position] in RANGE_WORDS:
+                    break  # Rango tras el singular: el final no es un artículo
+            # Los separadores de lista no se guardan; saltar los conectores de rango sueltos
+            while position < len(parts) and not parts[position].isdigit():
+                position += 1
+
+    references = list(dict.fromkeys(str(number) for number in numbers))
+    if len(references) > MAX_REFERENCED_ARTICLES:
+        logger.info(f"Referencia a {len(references)} artículos, se usan los primeros {MAX_REFERENCED_ARTICLES}")
+    return references[:MAX_REFERENCED_ARTICLES]
+
+def is_direct_lookup(text: str) -> bool:
+    """True si la consulta solo pide ver artículos ("muéstrame el artículo 7"), no una explicación o pregunta"""
+    residue = REFERENCE_PATTERN.sub(" ", text)
+    return all(token in LOOKUP_WORDS for token in tokenize(residue))
+
+def reference_intent(references: List[str]) -> Dict[str, Any]:
+    """Análisis de intención de una consulta sobre artículos citados, con el esquema de analyze_intent"""
+    return {
+        "type": "specific_article",
+        "keywords": [f"artículo {number}" for number in references],
+        "specificity": "high",
+        "suggested_search_terms": []
+    }
+
+def format_articles(articles: List[Dict[str, Any]], references: List[str]) -> str:
+    """Respuesta con el texto de los artículos pedidos y aviso de los que no existen"""
+    parts = [f"📜 **Artículo {article['metadata']['article_number']}**\n\n{article['content']}" for article in articles]
+
+    found = {article['metadata']['article_number'] for article in articles}
+    missing = [number for number in references if number not in found]
+    if missing:
+        label = "el artículo" if len(missing) == 1 else "los artículos"
+        parts.append(f"No encontré {label} {', '.join(missing)} en la Ley 2381 de 2024.")
+
+    return "\n\n".join(parts)
+
+class ArticleIndex:
+    """Índice en memoria de los artículos de la ley por número.
+
+    Se construye una vez con los datos procesados; consultar un artículo es una
+    búsqueda en un diccionario, sin leer el corpus ni pasar por el motor vectorial.
+    """
+
+    def __init__(self, articles: List[Dict[str, Any]]):
+        self.articles: Dict[str, Dict[str, Any]] = {}
+        for article in articles:
+            # Con varias normas en el corpus, los números se refieren a la ley principal
+            if (article.get('source') or settings.PRIMARY_SOURCE) != settings.PRIMARY_SOURCE:
+                continue
+            self.articles.setdefault(article['article_number'], article)
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
+    def __contains__(self, article_number: str) -> bool:
+        return article_number in self.articles
+
+    def get(self, article_number: str) -> Optional[Dict[str, Any]]:
+        """El artículo como documento (contenido y metadatos), o None si no existe"""
+        article = self.articles.get(article_number)
+        if article is None:
+            return None
+
+        return {
+            'id': f"article_{article_number}",
+            'content': article['content'],
+            'metadata': {
+                'article_number': article_number,
+                'type': 'article',
+                'length': len(article['content'])
+            },
+            'similarity_score': 1.0
+        }
@@ -0,0 +1,155 @@
+import sys
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.pdf_processor import LawPDFProcessor
+from src.corpus_store import write_corpus
+
+def discover_pdfs(directory: Path) -> List[Path]:
+    """Lista los PDFs del directorio, de mayor a menor tamaño para repartir mejor la carga"""
+    pdf_paths = [path for path in Path(directory).glob("*.pdf") if path.is_file()]
+    return sorted(pdf_paths, key=lambda path: path.stat().st_size, reverse=True)
+
+def process_source(pdf_path: Path, force: bool = False) -> Dict[str, Any]:
+    """Procesa un PDF en su propio directorio de salida (se ejecuta dentro de un proceso del pool)"""
+    source = pdf_path.stem
+    start = time.perf_counter()
+
+    processor = LawPDFProcessor(pdf_path=pdf_path, output_dir=settings.SOURCES_DIR / source)
+    # El paralelismo es entre documentos: cada proceso extrae sus páginas en serie
+    data = processor.process_pdf(parallel=False, force=force)
+
+    for item in data["articles"] + data["sections"]:
+        item["source"] = source
+
+    data["stats"] = {
+        "articles": len(data["articles"]),
+        "sections": len(data["sections"]),
+        "characters": data["metadata"]["total_characters"],
+        "pages_extracted": len(processor.page_timings),
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+    return data
+
+class BatchIngestor:
+    """Ingesta en paralelo de un directorio de normas en un corpus combinado"""
+
+    def __init__(self, directory: Optional[Path] = None, workers: Optional[int] = None):
+        self.directory = Path(directory or settings.LAWS_DIR)
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """Procesa todos los PDFs y escribe el corpus combinado (JSON y compacto)"""
+        pdf_paths = discover_pdfs(self.directory)
+        if not pdf_paths:
+            raise FileNotFoundError(f"No se encontraron PDFs en: {self.directory}")
+
+        logger.info(f"Procesando {len(pdf_paths)} PDFs con {min(self.workers, len(pdf_paths))} procesos...")
+        start = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        failed: Dict[str, str] = {}
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(pdf_paths))) as executor:
+            futures = {executor.submit(process_source, path, force): path for path in pdf_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results[path.stem] = future.result()
+                    logger.info(f"✅ {path.name}: {results[path.stem]['stats']}")
+                except Exception as e:
+                    logger.error(f"Error procesando {path.name}: {e}")
+                    failed[path.name] = str(e)
+
+        corpus = self.combine(results)
+        corpus["metadata"]["failed_sources"] = failed
+        corpus["metadata"]["total_seconds"] = round(time.perf_counter() - start, 3)
+
+        with open(settings.COMBINED_CORPUS_JSON, 'w', encoding='utf-8') as f:
+            json.dump(corpus, f, ensure_ascii=False)
+        write_corpus(corpus, settings.COMBINED_CORPUS_PATH, source_json=settings.COMBINED_CORPUS_JSON)
+
+        logger.info(f"Corpus combinado guardado en: {settings.COMBINED_CORPUS_JSON}")
+        if failed:
+            logger.warning(f"{len(failed)} de {len(pdf_paths)} fuentes fallaron y no están en el corpus: {', '.join(failed)}")
+        return corpus
+
+    def combine(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Une los resultados por fuente; la ley principal va primero y el resto por nombre"""
+        sources = sorted(results, key=lambda source: (source != settings.PRIMARY_SOURCE, source))
+
+        articles = [article for source in sources for article in results[source]["articles"]]
+        sections = [section for source in sources for section in results[source]["sections"]]
+
+        return {
+            "articles": articles,
+            "sections": sections,
+            "sources": {source: results[source]["stats"] for source in sources},
+            "metadata": {
+                "total_sources": len(sources),
+                "total_articles": len(articles),
+                "total_sections": len(sections),
+                "total_characters": sum(results[source]["stats"]["characters"] for source in sources)
+            }
+        }
+
+def index_combined_corpus() -> Dict[str, Any]:
+    """Sincroniza la colección con el corpus combinado (solo embeddings de lo nuevo o modificado)"""
+    from src.vector_store import LawVectorStore
+
+    if settings.INDEX_CORPUS != "combined":
+        logger.warning(
+            "INDEX_CORPUS=law: la próxima sincronización con la ley (python -m src.vector_store, "
+            "python -m src.index_artifact) quitará las demás normas; usa INDEX_CORPUS=combined"
+        )
+    vector_store = LawVectorStore(retrieval_backend="chroma")
+    documents = vector_store.prepare_documents(vector_store.load_processed_data("combined"))
+    return vector_store.update_index(vector_store._unique_documents(documents))
+
+def main():
+    """Procesa un directorio de PDFs en un corpus combinado"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingesta por lotes de un directorio de normas en PDF")
+    parser.add_argument("directory", nargs="?", type=Path, default=None, help="Directorio con los PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="Número de procesos")
+    parser.add_argument("--force", action="store_true", help="Ignora la caché de cada fuente")
+    parser.add_argument("--index", action="store_true", help="Indexa el corpus combinado en el vector store")
+    args = parser.parse_args()
+
+    try:
+        corpus = BatchIngestor(args.directory, args.workers).run(force=args.force)
+
+        print(f"✅ Corpus combinado: {corpus['metadata']['total_sources']} fuentes")
+        print(f"   - Artículos: {corpus['metadata']['total_articles']}")
+        print(f"   - Secciones: {corpus['metadata']['total_sections']}")
+        print(f"   - Tiempo total: {corpus['metadata']['total_seconds']}s")
+        for source, stats in corpus["sources"].items():
+            print(f"   📄 {source}: {stats['articles']} artículos, {stats['sections']} secciones, {stats['seconds']}s")
+
+        failed = corpus["metadata"]["failed_sources"]
+        for name, error in failed.items():
+            print(f"   ❌ {name}: {error}")
+        if failed:
+            print(f"❌ {len(failed)} fuentes fallaron; el corpus combinado está incompleto")
+            sys.exit(1)
+
+        if args.index:
+            report = index_combined_corpus()
+            print(f"✅ Índice sincronizado: {len(report['added'])} nuevos, {len(report['updated'])} modificados, "
+                  f"{len(report['removed'])} eliminados, {report['total_documents']} documentos")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import sys
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class MicroBatchingEncoder:
+    """Agrupa las consultas concurrentes en una sola pasada del encoder.
+
+    Un hilo toma la primera solicitud de la cola y espera hasta `window_ms` más
+    solicitudes (o hasta `max_batch_size` textos); luego codifica todo junto y
+    resuelve el Future de cada llamador con sus filas. Expone el mismo encode()
+    que SentenceTransformer, así que el vector store lo usa sin cambios.
+    """
+
+    def __init__(self, encoder, window_ms: Optional[float] = None, max_batch_size: Optional[int] = None):
+        self.encoder = encoder
+        self.window_seconds = (settings.QUERY_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch_size = max_batch_size or settings.QUERY_BATCH_MAX_SIZE
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.batch_sizes: Counter = Counter()
+
+        self._worker = threading.Thread(target=self._run, name="query-batching", daemon=True)
+        self._worker.start()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.encoder.get_sentence_embedding_dimension()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Encola los textos; el Future se resuelve con su matriz de embeddings"""
+        request = _Request(list(texts))
+        self._queue.put(request)
+
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return request.future
+
+    def encode(self, sentences: Union[str, List[str]], show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Embeddings de los textos, esperando a que se codifique el lote que los incluye"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        embeddings = self.submit(texts).result()
+        return embeddings[0] if single else embeddings
+
+    def close(self):
+        """Detiene el hilo después de procesar lo que ya está en la cola"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            batch = [request]
+            size = len(request.texts)
+            deadline = time.perf_counter() + self.window_seconds
+            stop = False
+
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: List[_Request]):
+        started_at = time.perf_counter()
+        texts = [text for request in batch for text in request.texts]
+
+        with self._metrics_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += len(texts)
+            self.batch_sizes[len(texts)] += 1
+            self.total_wait_seconds += sum(started_at - request.enqueued_at for request in batch)
+
+        try:
+            embeddings = np.asarray(self.encoder.encode(texts, batch_size=len(texts), show_progress_bar=False))
+        except Exception as e:
+            logger.error(f"Error codificando un lote de {len(texts)} consultas: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        start = 0
+        for request in batch:
+            request.future.set_result(embeddings[start:start + len(request.texts)])
+            start += len(request.texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "window_ms": self.window_seconds * 1000,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "requests": self.requests,
+                "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "mean_wait_ms": self.total_wait_seconds / self.requests * 1000 if self.requests else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items()))
+            }
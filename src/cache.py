@@ -0,0 +1,83 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+def normalize_query(query: str) -> str:
+    """Normaliza una consulta para usarla como clave de caché.
+
+    Minúsculas, espacios colapsados y sin signos de interrogación/exclamación ni
+    puntuación en los extremos: "¿Requisitos  pensión?" y "requisitos pensión"
+    comparten entrada.
+    """
+    query = unicodedata.normalize("NFC", query).lower()
+    query = re.sub(r'\s+', ' ', query)
+    return query.strip(" ¿?¡!.,;:")
+
+class LRUCache:
+    """Caché LRU acotada con expiración opcional (TTL), segura entre hilos"""
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor o None si no está o expiró"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Guarda un valor, expulsando el menos usado si se supera el tamaño"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Entradas vigentes (clave, valor), sin cambiar su orden de uso ni los contadores"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value) for key, (value, stored_at) in self._entries.items()
+                if self.ttl_seconds is None or now - stored_at <= self.ttl_seconds
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,133 @@
+import re
+import sys
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+# Marcadores de sub-unidades dentro de un artículo:
+# - parágrafo: "PARÁGRAFO", "PARÁGRAFO 1.", "PARÁGRAFO transitorio:" (en mayúsculas; en minúscula es una referencia)
+# - numeral: "1)" o "1." seguido de mayúscula
+# - literal: "a)"
+UNIT_PATTERN = re.compile(
+    r'(?P<paragraph>PAR[ÁA]GRAFO(?:\s+(?P<paragraph_label>\d+[°º]?|(?i:transitorio|primero|segundo|tercero|cuarto|quinto|sexto|s[ée]ptimo|octavo|noveno|d[ée]cimo)))?)'
+    r'|(?<=\s)(?P<numeral>\d{1,2})[.)]\s+(?=[A-ZÁÉÍÓÚÑ])'
+    r'|(?<=\s)(?P<literal>[a-z])\)\s'
+)
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.;:])\s+')
+
+class ArticleChunker:
+    """Divide artículos en fragmentos a nivel de parágrafo, numeral y literal.
+
+    Las sub-unidades consecutivas se agrupan hasta `max_chars`; un parágrafo siempre
+    abre un fragmento nuevo y una sub-unidad demasiado larga se corta en límites de
+    oración. Cada fragmento lleva el final del anterior como solapamiento.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, overlap_chars: Optional[int] = None):
+        self.max_chars = max_chars or settings.CHUNK_MAX_CHARS
+        self.overlap_chars = settings.CHUNK_OVERLAP_CHARS if overlap_chars is None else overlap_chars
+
+    def split_units(self, content: str) -> List[Dict[str, Any]]:
+        """Divide el contenido en sub-unidades con su etiqueta jerárquica y offsets"""
+        units = []
+        numeral: Optional[str] = None
+        paragraph: Optional[str] = None
+        position = 0
+        label = ""
+        is_paragraph = False
+
+        for match in UNIT_PATTERN.finditer(content):
+            if content[position:match.start()].strip():
+                units.append({"label": label, "start": position, "end": match.start(), "is_paragraph": is_paragraph})
+
+            if match.group("paragraph"):
+                paragraph = f"parágrafo {match.group('paragraph_label') or ''}".strip().lower()
+                numeral = None
+                label = paragraph
+            elif match.group("numeral"):
+                numeral = f"numeral {match.group('numeral')}"
+                label = ", ".join(part for part in (paragraph, numeral) if part)
+            else:
+                label = ", ".join(part for part in (paragraph, numeral, f"literal {match.group('literal')}") if part)
+
+            is_paragraph = bool(match.group("paragraph"))
+            position = match.start()
+
+        if content[position:].strip():
+            units.append({"label": label, "start": position, "end": len(content), "is_paragraph": is_paragraph})
+
+        return units
+
+    def _split_long(self, content: str, start: int, end: int) -> List[Dict[str, int]]:
+        """Corta un tramo más largo que max_chars en límites de oración"""
+        pieces = []
+        piece_start = start
+        last_boundary = None
+
+        for boundary in SENTENCE_BOUNDARY.finditer(content, start, end):
+            if boundary.start() - piece_start > self.max_chars and last_boundary is not None:
+                pieces.append({"start": piece_start, "end": last_boundary.start()})
+                piece_start = last_boundary.end()
+            last_boundary = boundary
+
+        pieces.append({"start": piece_start, "end": end})
+        return pieces
+
+    def chunk_article(self, article: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Fragmenta un artículo; los artículos cortos quedan en un único fragmento"""
+        content = article["content"]
+        spans: List[Dict[str, Any]] = []
+
+        if len(content) <= self.max_chars:
+            spans.append({"start": 0, "end": len(content), "labels": []})
+        else:
+            for unit in self.split_units(content):
+                unit_length = unit["end"] - unit["start"]
+                current = spans[-1] if spans else None
+
+                if current and not unit["is_paragraph"] and unit["end"] - current["start"] <= self.max_chars:
+                    current["end"] = unit["end"]
+                    current["labels"].append(unit["label"])
+                elif unit_length <= self.max_chars:
+                    spans.append({"start": unit["start"], "end": unit["end"], "labels": [unit["label"]]})
+                else:
+                    for piece in self._split_long(content, unit["start"], unit["end"]):
+                        spans.append({"start": piece["start"], "end": piece["end"], "labels": [unit["label"]]})
+
+        chunks = []
+        for index, span in enumerate(spans):
+            text = content[span["start"]:span["end"]].strip()
+            overlap = ""
+
+            if index > 0 and self.overlap_chars:
+                # Final del fragmento anterior, empezando en un límite de palabra
+                tail = content[max(spans[index - 1]["start"], span["start"] - self.overlap_chars):span["start"]]
+                overlap = tail[tail.find(" ") + 1:].strip() if " " in tail else tail.strip()
+
+            labels = [label for label in dict.fromkeys(span["labels"]) if label]
+            chunks.append({
+                "type": "chunk",
+                "article_number": article["article_number"],
+                "chunk_index": index,
+                "content": f"{overlap} {text}" if overlap else text,
+                "units": "; ".join(labels),
+                "start": span["start"],
+                "end": span["end"],
+                "chapter": article.get("chapter"),
+                "title": article.get("title"),
+                "source": article.get("source")
+            })
+
+        return chunks
+
+    def chunk_articles(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fragmenta una lista de artículos"""
+        chunks = [chunk for article in articles for chunk in self.chunk_article(article)]
+        logger.info(f"Generados {len(chunks)} fragmentos a partir de {len(articles)} artículos")
+        return chunks
@@ -0,0 +1,123 @@
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+# Fin de oración o de numeral ("...; b) ..."), seguido de espacio
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.;?!])\s+')
+TRUNCATION_MARK = " [...]"
+MIN_CUT_TOKENS = 50  # Presupuesto mínimo para cortar un fragmento a mitad de oración
+CHARS_PER_TOKEN = 4  # Aproximación sin tiktoken
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _load_encoding():
+    """Tokenizador BPE de tiktoken de CONTEXT_TOKENIZER, o None para usar la aproximación por caracteres"""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None and settings.CONTEXT_TOKENIZER == "chars":
+                _encoding = False
+            elif _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(settings.CONTEXT_TOKENIZER)
+                except Exception as e:
+                    logger.warning(f"Tokenizador {settings.CONTEXT_TOKENIZER} no disponible ({e}); se aproxima con caracteres / 4")
+                    _encoding = False
+    return _encoding or None
+
+def count_tokens(text: str) -> int:
+    """Tokens del texto con el tokenizador local (por defecto, la aproximación por caracteres)"""
+    encoding = _load_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+def _cut_to_tokens(text: str, budget: int) -> str:
+    """Prefijo del texto de a lo sumo `budget` tokens, cortado en el último espacio"""
+    encoding = _load_encoding()
+    if encoding is None:
+        prefix = text[:budget * CHARS_PER_TOKEN]
+    else:
+        prefix = encoding.decode(encoding.encode(text)[:budget])
+    return prefix.rsplit(" ", 1)[0] if " " in prefix else prefix
+
+def relevance(item: Dict[str, Any]) -> float:
+    """Puntuación del cross-encoder si el resultado fue reordenado; si no, la similitud"""
+    return item.get('rerank_score', item.get('similarity_score', 0.0))
+
+def truncate_to_tokens(text: str, budget: int) -> Optional[str]:
+    """Las oraciones iniciales del texto que caben en `budget` tokens.
+
+    Si no cabe ni la primera, el texto se corta en el límite de tokens (con al menos
+    MIN_CUT_TOKENS de presupuesto); si no, None.
+    """
+    budget -= count_tokens(TRUNCATION_MARK)
+    kept = []
+    used = 0
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        # +1 por el espacio que las une
+        cost = count_tokens(sentence) + (1 if kept else 0)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+
+    if kept:
+        return " ".join(kept) + TRUNCATION_MARK
+    if budget >= MIN_CUT_TOKENS:
+        return _cut_to_tokens(text, budget) + TRUNCATION_MARK
+    return None
+
+@dataclass
+class PackedContext:
+    """Fragmentos que se envían al LLM, en orden de relevancia, y tokens que ocupan"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+    truncated: int = 0  # Fragmentos recortados en un límite de oración o de tokens
+    dropped: int = 0  # Fragmentos que no cupieron
+
+def pack_context(content: List[Dict[str, Any]], budget: Optional[int] = None) -> PackedContext:
+    """Llena el presupuesto de tokens de entrada con los fragmentos más relevantes primero.
+
+    Cada fragmento entra completo si cabe en lo que queda del presupuesto; si no,
+    se recorta en el último límite de oración que entra (o en el límite de tokens)
+    y se sigue con los siguientes, que pueden ser más cortos. Se cuentan los tokens
+    del contenido (los encabezados "ARTÍCULO N:" del prompt son aparte).
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+    packed = PackedContext(budget=budget)
+    ranked = sorted(content, key=relevance, reverse=True)
+
+    for item in ranked:
+        remaining = budget - packed.tokens
+        tokens = count_tokens(item['content'])
+        if tokens <= remaining:
+            packed.items.append(item)
+            packed.tokens += tokens
+            continue
+
+        truncated = truncate_to_tokens(item['content'], remaining)
+        if truncated is not None:
+            packed.items.append({**item, 'content': truncated, 'truncated': True})
+            packed.tokens += count_tokens(truncated)
+            packed.truncated += 1
+
+    packed.dropped = len(ranked) - len(packed.items)
+    if packed.truncated or packed.dropped:
+        logger.info(
+            f"Contexto ajustado a {packed.tokens}/{budget} tokens: {len(packed.items)} fragmentos "
+            f"({packed.truncated} recortados, {packed.dropped} descartados)"
+        )
+    return packed
@@ -0,0 +1,313 @@
+import sys
+import json
+import hashlib
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Tuple
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+# Formato del archivo (little-endian):
+#   cabecera   | MAGIC, versión, nº de registros, offsets y tamaños de cada bloque, sha256 del JSON de origen
+#   registros  | RECORD_STRUCT de ancho fijo, en orden del documento
+#   búsqueda   | índices de registro (u32) ordenados por (tipo, número, fuente) para búsqueda binaria
+#   extras     | JSON pequeño con metadata y estructura (solo se decodifica si se pide)
+#   cadenas    | tabla de cadenas UTF-8 concatenadas
+MAGIC = b"LAWCORP1"
+FORMAT_VERSION = 3
+HEADER_STRUCT = struct.Struct("<8sIIQQQQQQ32s")
+# tipo, relleno, (offset, longitud) de número, contenido, capítulo, título y fuente, inicio y fin
+RECORD_STRUCT = struct.Struct("<B3xIIIIIIIIIIII")
+LOOKUP_STRUCT = struct.Struct("<I")
+
+# Longitud reservada para representar None en la tabla de cadenas
+NULL_LENGTH = 0xFFFFFFFF
+
+# Hash de origen vacío: corpus escrito sin un JSON del que provenga
+NO_SOURCE_HASH = bytes(32)
+
+RECORD_TYPES = ["article", "chapter", "title"]
+TYPE_CODES = {name: code for code, name in enumerate(RECORD_TYPES)}
+
+def file_hash(path: Path) -> str:
+    """sha256 del contenido del archivo (no depende de fechas de modificación, que cambian al copiar o clonar)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class CompactCorpus:
+    """Lector de solo lectura del corpus compacto, respaldado por mmap.
+
+    Abrir el archivo solo lee la cabecera; cada registro se decodifica bajo demanda,
+    así que consultar un artículo no deserializa el resto del corpus.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or settings.CORPUS_PATH)
+        self._file = open(self.path, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.record_count, self._records_offset, self._lookup_offset,
+         self._extras_offset, self._extras_size, self._strings_offset, self._strings_size,
+         source_hash) = HEADER_STRUCT.unpack_from(self._buffer, 0)
+        # sha256 del JSON del que se generó, para saber si sigue al día con él
+        self.source_hash: Optional[str] = None if source_hash == NO_SOURCE_HASH else source_hash.hex()
+
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Archivo de corpus inválido: {self.path}")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Versión de corpus no soportada: {version} (se esperaba {FORMAT_VERSION})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def close(self):
+        """Libera el mmap y el descriptor del archivo"""
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _bytes(self, offset: int, length: int) -> Optional[bytes]:
+        if length == NULL_LENGTH:
+            return None
+        start = self._strings_offset + offset
+        return self._buffer[start:start + length]
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        value = self._bytes(offset, length)
+        return None if value is None else value.decode('utf-8')
+
+    def _raw_record(self, index: int) -> Tuple:
+        return RECORD_STRUCT.unpack_from(self._buffer, self._records_offset + index * RECORD_STRUCT.size)
+
+    def _record_key(self, index: int) -> Tuple[int, bytes, bytes]:
+        """Clave de ordenación (tipo, número, fuente) en bytes sin decodificar el contenido"""
+        raw = self._raw_record(index)
+        return raw[0], self._bytes(raw[1], raw[2]), self._bytes(raw[9], raw[10]) or b""
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Decodifica un único registro con el mismo esquema que processed_law.json"""
+        if not 0 <= index < self.record_count:
+            raise IndexError(index)
+
+        (type_code, number_offset, number_length, content_offset, content_length,
+         chapter_offset, chapter_length, title_offset, title_length,
+         source_offset, source_length, start, end) = self._raw_record(index)
+
+        record_type = RECORD_TYPES[type_code]
+        number = self._string(number_offset, number_length)
+        record = {
+            "article_number" if record_type == "article" else "section_number": number,
+            "content": self._string(content_offset, content_length),
+            "type": record_type,
+            "start": start,
+            "end": end
+        }
+        if record_type == "article":
+            record["chapter"] = self._string(chapter_offset, chapter_length)
+        if record_type in ("article", "chapter"):
+            record["title"] = self._string(title_offset, title_length)
+        if source_length != NULL_LENGTH:
+            record["source"] = self._string(source_offset, source_length)
+        return record
+
+    def _lookup_index(self, position: int) -> int:
+        (index,) = LOOKUP_STRUCT.unpack_from(self._buffer, self._lookup_offset + position * LOOKUP_STRUCT.size)
+        return index
+
+    def _lower_bound(self, target: Tuple[int, bytes, bytes]) -> int:
+        """Primera posición de la tabla de búsqueda cuya clave es >= target"""
+        low, high = 0, self.record_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record_key(self._lookup_index(middle)) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find_index(self, target: Tuple[int, bytes, bytes], match_length: int = 3) -> Optional[int]:
+        """Índice del primer registro cuya clave coincide con target en sus primeros `match_length` campos"""
+        position = self._lower_bound(target)
+        if position < self.record_count:
+            index = self._lookup_index(position)
+            if self._record_key(index)[:match_length] == target[:match_length]:
+                return index
+        return None
+
+    def find(self, record_type: str, number: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Busca un registro por tipo, número y fuente con búsqueda binaria sobre la tabla ordenada.
+        
+        Sin fuente se prefiere un registro sin fuente o de la ley principal, y si no
+        existe, la primera coincidencia de tipo y número.
+        """
+        prefix = (TYPE_CODES[record_type], str(number).encode('utf-8'))
+
+        if source is not None:
+            index = self._find_index(prefix + (source.encode('utf-8'),))
+        else:
+            index = self._find_index(prefix + (settings.PRIMARY_SOURCE.encode('utf-8'),))
+            if index is None:
+                # La clave vacía ordena primero: registro sin fuente o primera coincidencia
+                index = self._find_index(prefix + (b"",), match_length=2)
+
+        return None if index is None else self.record(index)
+
+    def get_article(self, article_number: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Obtiene un artículo por su número"""
+        return self.find("article", article_number, source)
+
+    def iter_records(self, record_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Recorre los registros en orden del documento, opcionalmente filtrando por tipo"""
+        type_code = TYPE_CODES[record_type] if record_type else None
+        for index in range(self.record_count):
+            if type_code is None or self._raw_record(index)[0] == type_code:
+                yield self.record(index)
+
+    def extras(self) -> Dict[str, Any]:
+        """Metadata y estructura jerárquica del corpus"""
+        start = self._extras_offset
+        return json.loads(self._buffer[start:start + self._extras_size].decode('utf-8'))
+
+    def to_processed_data(self) -> Dict[str, Any]:
+        """Reconstruye el diccionario completo de processed_law.json"""
+        sections = [record for record in self.iter_records() if record["type"] != "article"]
+        data = {
+            "articles": list(self.iter_records("article")),
+            # Mismo orden que el segmentador: capítulos primero, luego títulos
+            "sections": sorted(sections, key=lambda record: record["type"] != "chapter")
+        }
+        data.update(self.extras())
+        return data
+
+def write_corpus(data: Dict[str, Any], path: Optional[Path] = None, source_json: Optional[Path] = None) -> Path:
+    """Escribe los datos procesados en el formato compacto.
+    
+    Con `source_json` (el JSON ya escrito con los mismos datos) la cabecera guarda
+    su sha256, que load_processed_data compara para no usar un corpus desactualizado.
+    """
+    path = Path(path or settings.CORPUS_PATH)
+    source_hash = bytes.fromhex(file_hash(source_json)) if source_json is not None else NO_SOURCE_HASH
+    strings = bytearray()
+    interned: Dict[str, Tuple[int, int]] = {}
+
+    def add_string(value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return 0, NULL_LENGTH
+        if value not in interned:
+            encoded = value.encode('utf-8')
+            interned[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return interned[value]
+
+    # Registros agrupados por fuente y en orden del documento (sin offsets se conserva el orden original)
+    items = list(data["articles"]) + list(data["sections"])
+    source_order: Dict[Optional[str], int] = {}
+    for item in items:
+        source_order.setdefault(item.get("source"), len(source_order))
+    items.sort(key=lambda item: (source_order[item.get("source")], item.get("start", 0)))
+
+    records = bytearray()
+    keys = []
+    for index, item in enumerate(items):
+        number = item["article_number"] if item["type"] == "article" else item["section_number"]
+        fields = (
+            TYPE_CODES[item["type"]],
+            *add_string(number),
+            *add_string(item["content"]),
+            *add_string(item.get("chapter")),
+            *add_string(item.get("title")),
+            *add_string(item.get("source")),
+            item.get("start", 0),
+            item.get("end", 0)
+        )
+        records.extend(RECORD_STRUCT.pack(*fields))
+        keys.append(((TYPE_CODES[item["type"]], number.encode('utf-8'), item.get("source", "").encode('utf-8')), index))
+
+    lookup = b"".join(LOOKUP_STRUCT.pack(index) for _, index in sorted(keys))
+    extras = json.dumps(
+        {key: value for key, value in data.items() if key not in ("articles", "sections")},
+        ensure_ascii=False
+    ).encode('utf-8')
+
+    records_offset = HEADER_STRUCT.size
+    lookup_offset = records_offset + len(records)
+    extras_offset = lookup_offset + len(lookup)
+    strings_offset = extras_offset + len(extras)
+
+    header = HEADER_STRUCT.pack(
+        MAGIC, FORMAT_VERSION, len(items), records_offset, lookup_offset,
+        extras_offset, len(extras), strings_offset, len(strings), source_hash
+    )
+
+    # Escritura atómica para no dejar un corpus a medias a los lectores
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(records)
+        f.write(lookup)
+        f.write(extras)
+        f.write(strings)
+    tmp_path.replace(path)
+
+    logger.info(f"Corpus compacto escrito: {path} ({len(items)} registros, {strings_offset + len(strings)} bytes)")
+    return path
+
+def convert_json_to_corpus(json_path: Optional[Path] = None, corpus_path: Optional[Path] = None) -> Path:
+    """Convierte un processed_law.json existente al formato compacto"""
+    json_path = Path(json_path or settings.PROCESSED_DATA_DIR / "processed_law.json")
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    return write_corpus(data, corpus_path, source_json=json_path)
+
+def main():
+    """Convierte processed_law.json al corpus compacto"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Convierte processed_law.json al formato compacto")
+    parser.add_argument("json_path", nargs="?", type=Path, default=None, help="JSON de entrada")
+    parser.add_argument("corpus_path", nargs="?", type=Path, default=None, help="Corpus de salida")
+    args = parser.parse_args()
+
+    try:
+        path = convert_json_to_corpus(args.json_path, args.corpus_path)
+
+        start = time.perf_counter()
+        with CompactCorpus(path) as corpus:
+            opened = time.perf_counter()
+            article = corpus.get_article("1")
+            found = time.perf_counter()
+
+        print(f"✅ Corpus compacto: {path}")
+        print(f"   - Registros: {len(corpus)}")
+        print(f"   - Apertura: {(opened - start) * 1000:.2f} ms")
+        print(f"   - Lectura del artículo 1: {(found - opened) * 1000:.3f} ms")
+        if article:
+            print(f"   Artículo {article['article_number']}: {article['content'][:120]}...")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
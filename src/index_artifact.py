@@ -0,0 +1,186 @@
+import sys
+import json
+import mmap
+import struct
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+# Formato del archivo (little-endian):
+#   cabecera    | MAGIC, versión, offsets y tamaños de cada bloque
+#   manifiesto  | JSON: modelo, dimensiones, nº de documentos, hash del corpus, estadísticas y checksum
+#   embeddings  | matriz float32 (documentos × dimensiones) normalizada, alineada a 64 bytes
+#   documentos  | JSON con ids, textos y metadatos
+# El checksum (sha256) cubre todo lo que sigue al manifiesto.
+MAGIC = b"LAWINDX1"
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sIIQQQQQ")
+ALIGNMENT = 64
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+class IndexArtifact:
+    """Artefacto de índice precompilado, abierto en solo lectura con mmap.
+
+    La matriz de embeddings se usa directamente desde el mmap, sin copiarla, así
+    que abrir el artefacto cuesta poco más que decodificar los documentos.
+    """
+
+    def __init__(self, path: Optional[Path] = None, expected_model: Optional[str] = None, verify: Optional[bool] = None):
+        self.path = Path(path or settings.INDEX_ARTIFACT_PATH)
+        self._file = open(self.path, 'rb')
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (magic, version, _, manifest_offset, manifest_size, embeddings_offset,
+             documents_offset, documents_size) = HEADER_STRUCT.unpack_from(self._buffer, 0)
+
+            if magic != MAGIC:
+                raise ValueError(f"Artefacto de índice inválido: {self.path}")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Versión de artefacto no soportada: {version} (se esperaba {FORMAT_VERSION})")
+
+            self.manifest: Dict[str, Any] = json.loads(self._buffer[manifest_offset:manifest_offset + manifest_size].decode('utf-8'))
+
+            expected_model = expected_model or settings.EMBEDDING_MODEL
+            if self.manifest["embedding_model"] != expected_model:
+                raise ValueError(
+                    f"El artefacto fue construido con {self.manifest['embedding_model']} "
+                    f"y el proyecto usa {expected_model}: reconstrúyelo con python -m src.index_artifact"
+                )
+
+            if settings.INDEX_ARTIFACT_VERIFY if verify is None else verify:
+                checksum = hashlib.sha256(memoryview(self._buffer)[embeddings_offset:]).hexdigest()
+                if checksum != self.manifest["checksum"]:
+                    raise ValueError(f"Artefacto de índice corrupto (checksum no coincide): {self.path}")
+
+            count, dimensions = self.manifest["count"], self.manifest["dimensions"]
+            self.embeddings = np.frombuffer(self._buffer, dtype=np.float32, count=count * dimensions, offset=embeddings_offset).reshape(count, dimensions)
+
+            documents = json.loads(self._buffer[documents_offset:documents_offset + documents_size].decode('utf-8'))
+            self.ids: List[str] = documents["ids"]
+            self.documents: List[str] = documents["documents"]
+            self.metadatas: List[Dict[str, Any]] = documents["metadatas"]
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def close(self):
+        """Libera el mmap y el descriptor del archivo"""
+        self.embeddings = None
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def write_artifact(ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]],
+                   statistics: Dict[str, Any], path: Optional[Path] = None) -> Path:
+    """Escribe el artefacto de índice con los embeddings normalizados"""
+    path = Path(path or settings.INDEX_ARTIFACT_PATH)
+
+    matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    documents_blob = json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas}, ensure_ascii=False).encode('utf-8')
+
+    # El relleno de alineación entre los embeddings y los documentos también queda cubierto por el checksum
+    embeddings_blob = matrix.astype('<f4').tobytes()
+    padding = _aligned(len(embeddings_blob)) - len(embeddings_blob)
+    payload = embeddings_blob + b"\0" * padding + documents_blob
+
+    manifest = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "embedding_model": statistics["embedding_model"],
+        "dimensions": int(matrix.shape[1]),
+        "count": len(ids),
+        "corpus_hash": statistics["corpus_hash"],
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "statistics": statistics,
+        "checksum": hashlib.sha256(payload).hexdigest()
+    }, ensure_ascii=False).encode('utf-8')
+
+    manifest_offset = HEADER_STRUCT.size
+    embeddings_offset = _aligned(manifest_offset + len(manifest))
+    documents_offset = embeddings_offset + len(embeddings_blob) + padding
+
+    header = HEADER_STRUCT.pack(
+        MAGIC, FORMAT_VERSION, 0, manifest_offset, len(manifest),
+        embeddings_offset, documents_offset, len(documents_blob)
+    )
+
+    # Escritura atómica para no dejar un artefacto a medias a los lectores
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(manifest)
+        f.write(b"\0" * (embeddings_offset - manifest_offset - len(manifest)))
+        f.write(payload)
+    tmp_path.replace(path)
+
+    logger.info(f"Artefacto de índice escrito: {path} ({len(ids)} documentos, {documents_offset + len(documents_blob)} bytes)")
+    return path
+
+def build_artifact(path: Optional[Path] = None) -> Path:
+    """Sincroniza la colección de ChromaDB con los datos procesados y la exporta como artefacto.
+
+    La sincronización es incremental, así que solo se generan embeddings de los
+    documentos nuevos o modificados.
+    """
+    from src.vector_store import LawVectorStore
+
+    vector_store = LawVectorStore(retrieval_backend="chroma")
+    vector_store.update_index()
+
+    stored = vector_store.backend.get_all()
+    return write_artifact(
+        stored['ids'], stored['embeddings'], stored['documents'], stored['metadatas'],
+        vector_store.index_stats, path
+    )
+
+def main():
+    """Construye el artefacto de índice para desplegar sin ChromaDB ni reindexar"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Construye el artefacto de índice precompilado")
+    parser.add_argument("output", nargs="?", type=Path, default=None, help="Ruta del artefacto")
+    args = parser.parse_args()
+
+    try:
+        path = build_artifact(args.output)
+
+        start = time.perf_counter()
+        with IndexArtifact(path, verify=True) as artifact:
+            opened = time.perf_counter()
+            manifest = artifact.manifest
+
+        print(f"✅ Artefacto de índice: {path}")
+        print(f"   - Documentos: {manifest['count']} ({manifest['dimensions']} dimensiones)")
+        print(f"   - Modelo: {manifest['embedding_model']}")
+        print(f"   - Hash del corpus: {manifest['corpus_hash'][:16]}...")
+        print(f"   - Apertura con verificación: {(opened - start) * 1000:.1f} ms")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import sys
+import time
+import queue
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+import pdfplumber
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.law_segmenter import LawSegmenter
+
+# Marca de fin del flujo entre el productor y el consumidor
+_END_OF_STREAM = object()
+
+def iter_pages(pdf_path: Path) -> Iterator[Optional[str]]:
+    """Extrae las páginas de un PDF una a una, liberando cada página tras leerla"""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text()
+            page.close()
+            yield text
+
+class StreamingIngestionPipeline:
+    """Extracción → segmentación → embeddings → ChromaDB, en flujo continuo.
+
+    Un hilo productor extrae páginas y emite documentos a una cola acotada; el hilo
+    principal los agrupa en lotes, genera los embeddings y los agrega (o actualiza) en la colección
+    en cuanto se llena cada lote. Mientras se calcula un lote, el productor sigue
+    extrayendo, y la memoria queda acotada por el tamaño de la cola y del lote.
+    """
+
+    def __init__(self, vector_store=None, batch_size: Optional[int] = None, queue_size: Optional[int] = None):
+        if vector_store is None:
+            from src.vector_store import LawVectorStore
+            vector_store = LawVectorStore()
+
+        self.vector_store = vector_store
+        self.segmenter = LawSegmenter()
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+
+    def iter_documents(self, pdf_paths: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+        """Emite los documentos indexables de cada PDF a medida que se segmentan"""
+        for pdf_path in pdf_paths:
+            logger.info(f"Procesando en flujo: {pdf_path}")
+            for item in self.segmenter.iter_segments(iter_pages(pdf_path)):
+                item["source"] = Path(pdf_path).stem
+                yield from self.vector_store.prepare_item_documents(item)
+
+    @staticmethod
+    def _put(documents: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """Encola sin bloquearse para siempre: False si el consumidor se detuvo"""
+        while not stop.is_set():
+            try:
+                documents.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, pdf_paths: List[Path], documents: queue.Queue, errors: List[BaseException], stop: threading.Event):
+        """Hilo productor: extracción y segmentación"""
+        try:
+            for document in self.iter_documents(pdf_paths):
+                if not self._put(documents, document, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            self._put(documents, _END_OF_STREAM, stop)
+
+    def run(self, pdf_paths: List[Path], reset: bool = False) -> Dict[str, Any]:
+        """Ejecuta el pipeline completo y retorna estadísticas de la ejecución.
+
+        Como update_index, sincroniza la colección por el hash de cada documento:
+        solo se generan embeddings de los nuevos o modificados (upsert) y al final
+        se eliminan los documentos guardados que esta ejecución no produjo.
+        """
+        if reset:
+            self.vector_store.reset_vector_store()
+
+        start_time = time.perf_counter()
+        stored = self.vector_store.backend.content_hashes()
+        documents: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        errors: List[BaseException] = []
+        stop = threading.Event()
+
+        producer = threading.Thread(
+            target=self._produce,
+            args=(list(pdf_paths), documents, errors, stop),
+            name="ingestion-producer",
+            daemon=True
+        )
+        producer.start()
+
+        batch = []
+        seen_ids = set()
+        stats = {"documents": 0, "batches": 0, "unchanged": 0, "removed": 0, "duplicates": 0, "first_batch_seconds": None}
+
+        try:
+            while True:
+                document = documents.get()
+                if document is _END_OF_STREAM:
+                    break
+
+                if document['id'] in seen_ids:
+                    logger.warning(f"ID duplicado encontrado y omitido: {document['id']}")
+                    stats["duplicates"] += 1
+                    continue
+                seen_ids.add(document['id'])
+
+                if stored.get(document['id']) == document['metadata']['content_hash']:
+                    stats["unchanged"] += 1
+                    continue
+
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, stats, start_time)
+                    batch = []
+
+            if batch:
+                self._flush(batch, stats, start_time)
+        finally:
+            # Si el consumidor falla, el productor no queda bloqueado en la cola llena
+            stop.set()
+            producer.join()
+
+        if errors:
+            raise errors[0]
+
+        # Solo con el flujo completo se sabe qué documentos ya no existen
+        removed = [doc_id for doc_id in stored if doc_id not in seen_ids]
+        if removed:
+            logger.info(f"Eliminando {len(removed)} documentos que ya no existen...")
+            self.vector_store.backend.delete(removed)
+        stats["removed"] = len(removed)
+
+        # El índice BM25 y la instantánea de estadísticas necesitan todo el corpus: se construyen al final
+        self.vector_store.finish_indexing(build_seconds=time.perf_counter() - start_time)
+
+        stats["total_seconds"] = time.perf_counter() - start_time
+        logger.info(
+            f"✅ Pipeline completado: {stats['documents']} documentos en {stats['batches']} lotes, "
+            f"{stats['unchanged']} sin cambios, {stats['removed']} eliminados ({stats['total_seconds']:.1f}s)"
+        )
+        return stats
+
+    def _flush(self, batch: List[Dict[str, Any]], stats: Dict[str, Any], start_time: float):
+        """Genera embeddings del lote y lo agrega a la colección (o reemplaza los documentos modificados)"""
+        self.vector_store.upsert_documents(batch, show_progress_bar=False)
+
+        stats["documents"] += len(batch)
+        stats["batches"] += 1
+        if stats["first_batch_seconds"] is None:
+            stats["first_batch_seconds"] = time.perf_counter() - start_time
+
+def main():
+    """Función principal: indexa uno o varios PDFs sin pasar por processed_law.json"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pipeline en flujo de extracción a indexación")
+    parser.add_argument("pdfs", nargs="*", type=Path, help="PDFs a indexar (por defecto, la Ley 2381)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Documentos por lote de embeddings")
+    parser.add_argument("--reset", action="store_true", help="Vacía la colección antes de indexar")
+    args = parser.parse_args()
+
+    pdf_paths = args.pdfs or [settings.LAW_PDF_PATH]
+
+    try:
+        pipeline = StreamingIngestionPipeline(batch_size=args.batch_size)
+        stats = pipeline.run(pdf_paths, reset=args.reset)
+
+        print("✅ Indexación en flujo completada:")
+        for key, value in stats.items():
+            print(f"   {key}: {value}")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
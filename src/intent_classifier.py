@@ -0,0 +1,158 @@
+import re
+import sys
+import json
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.sparse_index import tokenize
+from src.article_references import parse_article_references, reference_intent
+
+INTENT_TYPES = ("definition", "procedure", "requirement", "calculation", "general", "specific_article")
+SPECIFICITY_LEVELS = ("high", "medium", "low")
+WORD_PATTERN = re.compile(r'\w+')
+# Palabras de la pregunta que no describen el tema (las vacías las descarta tokenize)
+QUESTION_WORDS = frozenset(
+    "qué cuál cuáles cómo cuándo cuánto cuánta cuántos cuántas dónde quién quiénes "
+    "es son soy está están estoy hay dice dicen puede puedo pueden debo debe tengo tiene si me mi".split()
+)
+DISTINCTIVE_TERMS = 3  # Palabras clave de mayor IDF que forman el segundo término sugerido
+
+def load_examples(path: Optional[Path] = None) -> List[Dict[str, str]]:
+    """Consultas etiquetadas con 'query', 'type' y 'specificity'"""
+    with open(path or settings.INTENT_EXAMPLES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def extract_keywords(query: str) -> List[str]:
+    """Palabras de la consulta sin palabras vacías ni de pregunta, en orden y sin repetir"""
+    words = (word for word in WORD_PATTERN.findall(query.lower()) if tokenize(word) and word not in QUESTION_WORDS)
+    return list(dict.fromkeys(words))
+
+class IntentClassifier:
+    """Clasificador de intención local, con el mismo esquema que analyze_intent.
+
+    Las referencias a artículos ("artículo 15") se resuelven con reglas. El resto
+    se clasifica por el centroide más cercano de los embeddings de consultas
+    etiquetadas, con el mismo encoder de la búsqueda (el embedding de la consulta
+    queda en la caché y la búsqueda lo reutiliza). La confianza es el softmax de
+    las similitudes con los centroides de tipo; por debajo de INTENT_MIN_CONFIDENCE
+    classify() retorna None y el agente consulta al LLM. Los términos de búsqueda
+    sugeridos salen de las palabras clave, para que la expansión de la consulta
+    no dependa del LLM.
+    """
+
+    def __init__(self, vector_store, examples: Optional[List[Dict[str, str]]] = None,
+                 min_confidence: Optional[float] = None, temperature: Optional[float] = None):
+        self.vector_store = vector_store
+        self.examples = examples if examples is not None else load_examples()
+        self.min_confidence = settings.INTENT_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.temperature = temperature or settings.INTENT_TEMPERATURE
+        self._centroids: Optional[Dict[str, Tuple[Tuple[str, ...], np.ndarray]]] = None
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallbacks = 0
+
+    @property
+    def available(self) -> bool:
+        """Sin modelo de embeddings (modo ligero) solo quedan las reglas"""
+        return not self.vector_store.lightweight
+
+    @property
+    def centroids(self) -> Dict[str, Tuple[Tuple[str, ...], np.ndarray]]:
+        """Por campo ('type', 'specificity'): etiquetas y matriz de centroides normalizados; se calculan en el primer uso"""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    embeddings = self._normalize(np.asarray(
+                        self.vector_store.query_encoder.encode([example['query'] for example in self.examples], show_progress_bar=False),
+                        dtype=np.float32
+                    ))
+                    centroids = {}
+                    for field, labels in (("type", INTENT_TYPES), ("specificity", SPECIFICITY_LEVELS)):
+                        present = tuple(label for label in labels if any(example[field] == label for example in self.examples))
+                        matrix = np.stack([
+                            embeddings[[i for i, example in enumerate(self.examples) if example[field] == label]].mean(axis=0)
+                            for label in present
+                        ])
+                        centroids[field] = (present, self._normalize(matrix))
+                    self._centroids = centroids
+                    logger.info(f"Clasificador de intención listo: {len(self.examples)} ejemplos")
+        return self._centroids
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+    def _nearest(self, field: str, embedding: np.ndarray) -> Tuple[str, float]:
+        """Etiqueta del centroide más cercano y su probabilidad (softmax de las similitudes)"""
+        labels, matrix = self.centroids[field]
+        logits = matrix @ embedding / self.temperature
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        best = int(np.argmax(probabilities))
+        return labels[best], float(probabilities[best])
+
+    def predict(self, query: str) -> Tuple[Dict[str, Any], float]:
+        """Análisis de intención y confianza (1.0 para las reglas)"""
+        references = parse_article_references(query)
+        if references:
+            return {**reference_intent(references), "keywords": extract_keywords(query)}, 1.0
+
+        embedding = self._normalize(np.asarray(self.vector_store.embed_query(query), dtype=np.float32))
+        intent_type, confidence = self._nearest("type", embedding)
+        specificity, _ = self._nearest("specificity", embedding)
+        keywords = extract_keywords(query)
+        return {
+            "type": intent_type,
+            "keywords": keywords,
+            "specificity": specificity,
+            "suggested_search_terms": self.suggest_search_terms(keywords)
+        }, confidence
+
+    def suggest_search_terms(self, keywords: List[str]) -> List[str]:
+        """Términos de búsqueda adicionales sin LLM: las palabras clave y, con BM25, las más raras del corpus"""
+        terms = [" ".join(keywords)] if len(keywords) > 1 else []
+
+        index = self.vector_store.sparse_index
+        if index is not None:
+            def idf(word: str) -> float:
+                positions = [index.vocabulary[token] for token in tokenize(word) if token in index.vocabulary]
+                return max((float(index.idf[position]) for position in positions), default=0.0)
+
+            rarest = set(sorted((word for word in keywords if idf(word) > 0), key=idf, reverse=True)[:DISTINCTIVE_TERMS])
+            distinctive = " ".join(word for word in keywords if word in rarest)  # En el orden de la consulta
+            if distinctive and distinctive not in terms:
+                terms.append(distinctive)
+        return terms
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        """Análisis de intención local, o None si la confianza no alcanza el umbral"""
+        if not self.available and not parse_article_references(query):
+            self.fallbacks += 1
+            return None
+
+        intent_analysis, confidence = self.predict(query)
+        if confidence < self.min_confidence:
+            self.fallbacks += 1
+            logger.info(f"Intención local poco confiable ({intent_analysis['type']}, {confidence:.2f}); se consulta al LLM")
+            return None
+
+        self.local += 1
+        logger.info(f"Análisis de intención local: {intent_analysis['type']} - {intent_analysis['specificity']} ({confidence:.2f})")
+        return intent_analysis
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.local + self.fallbacks
+        return {
+            "examples": len(self.examples),
+            "min_confidence": self.min_confidence,
+            "local": self.local,
+            "llm_fallbacks": self.fallbacks,
+            "local_rate": self.local / total if total else 0.0
+        }
@@ -0,0 +1,296 @@
+import re
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+from loguru import logger
+
+# Una sola pasada: cualquier palabra clave estructural es un token candidato
+TOKEN_PATTERN = re.compile(r'ARTÍCULO|CAPÍTULO|TÍTULO', re.IGNORECASE)
+
+# Sobre una copia en mayúsculas la búsqueda sensible a mayúsculas es ~2x más rápida
+UPPER_TOKEN_PATTERN = re.compile(r'ARTÍCULO|CAPÍTULO|TÍTULO')
+
+# Encabezados anclados en la posición del token (mismas reglas que los patrones originales)
+HEADER_PATTERNS = {
+    "article": re.compile(r'ARTÍCULO\s+(\d+)\.?\s*', re.IGNORECASE),
+    "chapter": re.compile(r'CAPÍTULO\s+([IVX\d]+)\.?\s*', re.IGNORECASE),
+    "title": re.compile(r'TÍTULO\s+([IVX\d]+)\.?\s*', re.IGNORECASE),
+}
+
+# Inicio de un encabezado de artículo: ningún segmento cruza esta posición
+ARTICLE_HEADER_PATTERN = re.compile(r'ARTÍCULO\s+\d+', re.IGNORECASE)
+
+KEYWORD_TYPES = {"ARTÍCULO": "article", "CAPÍTULO": "chapter", "TÍTULO": "title"}
+
+class LawSegmenter:
+    """Segmentador jerárquico TÍTULO → CAPÍTULO → ARTÍCULO en una sola pasada lineal.
+
+    El texto se recorre una vez buscando palabras clave; cada segmento termina en
+    la siguiente palabra clave relevante para su tipo:
+    - artículo: siguiente encabezado de artículo numerado
+    - capítulo: siguiente "ARTÍCULO" o "CAPÍTULO"
+    - título: siguiente "ARTÍCULO", "CAPÍTULO" o "TÍTULO"
+
+    Estas reglas reproducen exactamente las expresiones regulares anteriores, por
+    lo que el contenido de artículos y secciones no cambia.
+    """
+
+    def tokenize(self, text: str) -> List[Dict[str, Any]]:
+        """Encuentra las palabras clave estructurales y sus encabezados numerados"""
+        tokens = []
+
+        # upper() nunca acorta un carácter: si la longitud se conserva, los offsets coinciden
+        upper_text = text.upper()
+        if len(upper_text) == len(text):
+            matches = UPPER_TOKEN_PATTERN.finditer(upper_text)
+        else:
+            matches = TOKEN_PATTERN.finditer(text)
+
+        for match in matches:
+            keyword = text[match.start():match.end()]
+            token_type = KEYWORD_TYPES[keyword.upper()]
+            header = HEADER_PATTERNS[token_type].match(text, match.start())
+
+            tokens.append({
+                "type": token_type,
+                "number": header.group(1) if header else None,
+                "start": match.start(),
+                "body_start": header.end() if header else match.end(),
+                # Los encabezados reales de la ley están en mayúsculas; las referencias en el cuerpo no
+                "is_heading": header is not None and keyword.isupper()
+            })
+
+        return tokens
+
+    def segment_block(self, text: str) -> List[Dict[str, Any]]:
+        """Segmenta un texto en artículos, capítulos y títulos crudos (sin deduplicar), con offsets locales"""
+        tokens = self.tokenize(text)
+        segments = []
+
+        # Recorrido inverso: siguiente límite de cada tipo para cada token
+        next_article = next_article_or_chapter = next_any = len(text)
+        ends = [0] * len(tokens)
+
+        for i in range(len(tokens) - 1, -1, -1):
+            token = tokens[i]
+            if token["type"] == "article":
+                ends[i] = next_article
+            elif token["type"] == "chapter":
+                ends[i] = next_article_or_chapter
+            else:
+                ends[i] = next_any
+
+            next_any = token["start"]
+            if token["type"] in ("article", "chapter"):
+                next_article_or_chapter = token["start"]
+            if token["type"] == "article" and token["number"] is not None:
+                next_article = token["start"]
+
+        for token, end in zip(tokens, ends):
+            if token["number"] is None:
+                continue
+
+            segments.append({
+                "type": token["type"],
+                "number": token["number"],
+                "start": token["start"],
+                "end": end,
+                "is_heading": token["is_heading"],
+                # Equivale a colapsar \s+ en un espacio y recortar los extremos
+                "content": " ".join(text[token["body_start"]:end].split())
+            })
+
+        return segments
+
+    def assemble(self, blocks: List[Tuple[int, List[Dict[str, Any]]]]) -> Tuple[List[Dict], List[Dict], Dict[str, Any]]:
+        """Une bloques segmentados (offset base, segmentos) en artículos, secciones y árbol jerárquico"""
+        article_matches = []
+        section_matches = []
+        state = {"title": None, "chapter": None}
+
+        for base, segments in blocks:
+            for segment in segments:
+                resolved = self._resolve_segment(segment, base, state)
+                if resolved["type"] == "article":
+                    article_matches.append(resolved)
+                else:
+                    section_matches.append(resolved)
+
+        articles = self.dedupe_articles(article_matches)
+        structure = self.build_structure(articles, section_matches)
+        sections = self.dedupe_sections(section_matches)
+
+        for section in sections:
+            del section["is_heading"]
+
+        return articles, sections, structure
+
+    def _resolve_segment(self, segment: Dict[str, Any], base: int, state: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        """Convierte un segmento crudo en artículo o sección con offsets globales y padres"""
+        start = base + segment["start"]
+        end = base + segment["end"]
+
+        if segment["type"] == "article":
+            return {
+                "article_number": segment["number"],
+                "content": segment["content"],
+                "type": "article",
+                "start": start,
+                "end": end,
+                "chapter": state["chapter"],
+                "title": state["title"]
+            }
+
+        if segment["is_heading"]:
+            if segment["type"] == "title":
+                state["title"], state["chapter"] = segment["number"], None
+            else:
+                state["chapter"] = segment["number"]
+
+        section = {
+            "section_number": segment["number"],
+            "content": segment["content"],
+            "type": segment["type"],
+            "start": start,
+            "end": end,
+            "is_heading": segment["is_heading"]
+        }
+        if segment["type"] == "chapter":
+            section["title"] = state["title"]
+        return section
+
+    def iter_segments(self, pages: Iterable[Optional[str]]) -> Iterator[Dict[str, Any]]:
+        """Segmenta un flujo de páginas y emite cada artículo o sección en cuanto está completo.
+
+        Ningún segmento cruza el inicio de un encabezado de artículo, así que todo el
+        texto anterior al último encabezado visto ya es definitivo. El búfer solo
+        retiene el texto desde ese encabezado: como mucho un artículo más una página.
+        Como en segment(), los capítulos salen antes que los títulos: los títulos
+        (unos pocos) se emiten al final.
+        """
+        buffer = ""
+        base = 0
+        state = {"title": None, "chapter": None}
+        seen_articles = set()
+        seen_sections = set()
+        titles = []
+
+        def emit(text: str, offset: int) -> Iterator[Dict[str, Any]]:
+            for segment in self.segment_block(text):
+                resolved = self._resolve_segment(segment, offset, state)
+                if resolved["type"] == "article":
+                    if self._accept_article(resolved, seen_articles):
+                        yield resolved
+                elif self._accept_section(resolved, seen_sections):
+                    del resolved["is_heading"]
+                    if resolved["type"] == "title":
+                        titles.append(resolved)
+                    else:
+                        yield resolved
+
+        for page in pages:
+            if not page:
+                continue
+
+            buffer += page + "\n"
+            headers = [match.start() for match in ARTICLE_HEADER_PATTERN.finditer(buffer)]
+            cut = headers[-1] if headers else 0
+
+            if cut > 0:
+                yield from emit(buffer[:cut], base)
+                buffer = buffer[cut:]
+                base += cut
+
+        if buffer:
+            yield from emit(buffer, base)
+        yield from titles
+
+    def segment(self, text: str) -> Tuple[List[Dict], List[Dict], Dict[str, Any]]:
+        """Segmenta el texto completo en una sola pasada"""
+        return self.assemble([(0, self.segment_block(text))])
+
+    def build_structure(self, articles: List[Dict[str, Any]], sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Construye el árbol TÍTULO → CAPÍTULO → ARTÍCULO con los offsets de cada nodo"""
+        root = {"type": "law", "children": []}
+
+        # Encabezados reales y artículos únicos, en orden de aparición
+        nodes = [
+            {"type": section["type"], "number": section["section_number"], "start": section["start"], "children": []}
+            for section in sections if section["is_heading"]
+        ]
+        nodes += [
+            {"type": "article", "number": article["article_number"], "start": article["start"], "end": article["end"]}
+            for article in articles
+        ]
+        nodes.sort(key=lambda node: node["start"])
+
+        # Pila de ancestros abiertos: [raíz, título?, capítulo?]
+        levels = {"law": 0, "title": 1, "chapter": 2}
+        stack = [root]
+        last_end = 0
+
+        for node in nodes:
+            if node["type"] == "article":
+                stack[-1]["children"].append(node)
+                last_end = max(last_end, node["end"])
+                continue
+
+            # Cerrar los nodos del mismo nivel o inferior
+            while levels[stack[-1]["type"]] >= levels[node["type"]]:
+                stack.pop()["end"] = node["start"]
+
+            stack[-1]["children"].append(node)
+            stack.append(node)
+
+        while len(stack) > 1:
+            stack.pop()["end"] = last_end
+
+        return root
+
+    def dedupe_articles(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Descarta artículos duplicados o demasiado cortos conservando el primero encontrado"""
+        seen_articles = set()  # Para evitar duplicados
+        articles = [article for article in matches if self._accept_article(article, seen_articles)]
+
+        logger.info(f"Se encontraron {len(articles)} artículos únicos")
+        return articles
+
+    def dedupe_sections(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Descarta secciones duplicadas o demasiado cortas; capítulos primero, luego títulos"""
+        seen_sections = set()  # Para evitar duplicados
+        sections = [
+            section
+            for section_type in ("chapter", "title")
+            for section in matches
+            if section["type"] == section_type and self._accept_section(section, seen_sections)
+        ]
+
+        logger.info(f"Se encontraron {len(sections)} secciones únicas")
+        return sections
+
+    def _accept_article(self, article: Dict[str, Any], seen_articles: set) -> bool:
+        """Indica si el artículo es nuevo y suficientemente largo, y lo registra como visto"""
+        article_number = article["article_number"]
+
+        # Verificar si ya procesamos este artículo
+        if article_number in seen_articles:
+            logger.warning(f"Artículo {article_number} duplicado - omitiendo")
+            return False
+
+        if len(article["content"]) > 50:  # Filtrar artículos muy cortos
+            seen_articles.add(article_number)
+            return True
+        return False
+
+    def _accept_section(self, section: Dict[str, Any], seen_sections: set) -> bool:
+        """Indica si la sección es nueva y suficientemente larga, y la registra como vista"""
+        # Crear ID único
+        section_id = f"{section['type']}_{section['section_number']}"
+
+        # Verificar duplicados
+        if section_id in seen_sections:
+            logger.warning(f"Sección {section_id} duplicada - omitiendo")
+            return False
+
+        if len(section["content"]) > 20:
+            seen_sections.add(section_id)
+            return True
+        return False
@@ -1,9 +1,10 @@
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 import json
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from concurrent.futures import ThreadPoolExecutor
 import openai
 from loguru import logger
 
@@ -11,7 +12,24 @@ from loguru import logger
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.settings import settings
-from src.vector_store import LawVectorStore
+from src.vector_store import LawVectorStore, cosine_similarity
+from src.intent_classifier import IntentClassifier
+from src.answer_cache import AnswerCache
+from src.article_references import parse_article_references, is_direct_lookup, reference_intent, format_articles
+from src.stage_timer import StageTimer
+from src.streaming import DeltaRecorder, QueryStream
+from src.context_packer import pack_context
+
+# Respuestas de error de la generación: se muestran al usuario pero no se cachean
+GENERATION_ERROR = "Lo siento, ocurrió un error al procesar tu consulta: "
+SUMMARY_ERROR = "Error al generar resumen: "
+
+# Fragmentos que recibe el LLM según la especificidad de la consulta
+N_RESULTS_BY_SPECIFICITY = {
+    "high": 3,
+    "medium": 5,
+    "low": 7
+}
 
 @dataclass
 class QueryResult:
@@ -21,6 +39,10 @@ class QueryResult:
     query: str
     timestamp: datetime
     processing_time: float
+    timings: Dict[str, float] = field(default_factory=dict)  # Duración de cada etapa (segundos)
+    cache_hit: Optional[str] = None  # "exact" | "semantic" si la respuesta vino de la caché
+    time_to_first_text: Optional[float] = None  # Segundos hasta el primer fragmento (solo en streaming)
+    context_tokens: int = 0  # Tokens del contexto enviado al LLM
 
 class OpenAIAgent:
     def __init__(self):
@@ -36,14 +58,25 @@ class OpenAIAgent:
             raise
             
         self.vector_store = LawVectorStore()
-        self.conversation_cache = {}
+        self.intent_classifier = IntentClassifier(self.vector_store) if settings.INTENT_CLASSIFIER == "local" else None
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+        self.answer_cache = AnswerCache(self.vector_store)
         
         # Verificar que el vector store esté poblado
-        if self.vector_store.collection.count() == 0:
+        if self.vector_store.index_stats['total_documents'] == 0:
             logger.warning("Vector store vacío. Ejecuta: python -m src.vector_store")
     
     def analyze_intent(self, query: str) -> Dict[str, Any]:
-        """Analiza la intención de la consulta del usuario"""
+        """Analiza la intención de la consulta: clasificador local y, si no tiene suficiente confianza, el LLM"""
+        if self.intent_classifier is not None:
+            intent_analysis = self.intent_classifier.classify(query)
+            if intent_analysis is not None:
+                return intent_analysis
+        
+        return self.analyze_intent_llm(query)
+    
+    def analyze_intent_llm(self, query: str) -> Dict[str, Any]:
+        """Analiza la intención de la consulta del usuario con el LLM"""
         intent_prompt = f"""
         Analiza la siguiente consulta sobre la Ley 2381 de 2024 (Sistema de Protección Social) y determina:
 
@@ -112,46 +145,77 @@ class OpenAIAgent:
                 "suggested_search_terms": [query]
             }
     
-    def search_relevant_content(self, query: str, intent_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Busca contenido relevante basado en la consulta y análisis de intención"""
+    def search_initial(self, query: str) -> List[Dict[str, Any]]:
+        """Búsqueda de la consulta original, que no depende del análisis de intención.
         
-        # Determinar número de resultados según especificidad
-        n_results = {
-            "high": 3,
-            "medium": 5,
-            "low": 7
-        }.get(intent_analysis["specificity"], 5)
+        Se pide la profundidad máxima que podría usar search_relevant_content, así
+        que recortar después da los mismos resultados que buscar con la intención.
+        """
+        depth = settings.RERANK_CANDIDATES if settings.RERANK_ENABLED else max(N_RESULTS_BY_SPECIFICITY.values())
+        return self.vector_store.search(query, n_results=depth)
+    
+    def search_relevant_content(self, query: str, intent_analysis: Dict[str, Any],
+                                initial_results: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Busca contenido relevante basado en la consulta y análisis de intención.
         
-        # Buscar con la consulta original
-        results = self.vector_store.search(query, n_results=n_results)
+        Con `initial_results` (de search_initial) la consulta original no se vuelve
+        a buscar: solo los términos sugeridos.
+        """
         
-        # Si hay términos de búsqueda sugeridos, hacer búsquedas adicionales
-        if intent_analysis.get("suggested_search_terms"):
-            for term in intent_analysis["suggested_search_terms"][:2]:  # Máximo 2 términos adicionales
-                if term.lower() != query.lower():
-                    additional_results = self.vector_store.search(term, n_results=3)
-                    results.extend(additional_results)
+        # Determinar número de resultados según especificidad
+        n_results = N_RESULTS_BY_SPECIFICITY.get(intent_analysis["specificity"], 5)
         
-        # Eliminar duplicados manteniendo los de mayor similitud
-        seen_ids = {}
-        unique_results = []
+        # Consulta original más hasta 2 términos sugeridos, en una sola búsqueda
+        queries = [query]
+        for term in intent_analysis.get("suggested_search_terms", [])[:2]:  # Máximo 2 términos adicionales
+            if term.lower() != query.lower():
+                queries.append(term)
         
-        for result in results:
-            result_id = result['metadata'].get('article_number', result['metadata'].get('section_number', 'unknown'))
-            
-            if result_id not in seen_ids or result['similarity_score'] > seen_ids[result_id]['similarity_score']:
-                seen_ids[result_id] = result
+        # Con reordenamiento, lista acotada de candidatos; el cross-encoder deja solo los de mayor confianza
+        depth = settings.RERANK_CANDIDATES if settings.RERANK_ENABLED else n_results
         
-        unique_results = list(seen_ids.values())
+        # search_many ya elimina duplicados (conservando la mayor similitud) y ordena por relevancia
+        if initial_results is None:
+            results = self.vector_store.search_many(queries, n_results=depth)
+        else:
+            extra_results = self.vector_store.search_many(queries[1:], n_results=depth)
+            results = self.vector_store.merge_rankings([initial_results, extra_results])
         
-        # Ordenar por relevancia
-        unique_results.sort(key=lambda x: x['similarity_score'], reverse=True)
+        if settings.RERANK_ENABLED:
+            return self.vector_store.rerank(query, results)
         
         # Limitar resultados finales
-        return unique_results[:n_results]
+        return results[:n_results]
     
-    def generate_response(self, query: str, relevant_content: List[Dict[str, Any]], intent_analysis: Dict[str, Any]) -> str:
-        """Genera respuesta usando OpenAI GPT con el contenido relevante"""
+    def _complete(self, messages: List[Dict[str, str]], on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """Texto completo de la respuesta del modelo; con on_delta se pide en streaming"""
+        if on_delta is None:
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                max_tokens=1500,
+                temperature=0.3
+            )
+            return response.choices[0].message.content
+        
+        parts = []
+        stream = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=1500,
+            temperature=0.3,
+            stream=True
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        return "".join(parts)
+    
+    def generate_response(self, query: str, relevant_content: List[Dict[str, Any]], intent_analysis: Dict[str, Any],
+                          on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """Genera respuesta usando OpenAI GPT con el contenido relevante (en streaming con on_delta)"""
         
         # Preparar contexto
         context_parts = []
@@ -162,13 +226,17 @@ class OpenAIAgent:
             if metadata['type'] == 'article':
                 source_ref = f"Artículo {metadata['article_number']}"
                 context_parts.append(f"ARTÍCULO {metadata['article_number']}:\n{content['content']}")
+            elif metadata['type'] == 'chunk':
+                source_ref = f"Artículo {metadata['article_number']}"
+                units = f" ({metadata['units']})" if metadata.get('units') else ""
+                context_parts.append(f"ARTÍCULO {metadata['article_number']}{units}:\n{content['content']}")
             else:
                 source_ref = f"{metadata['type'].title()} {metadata.get('section_number', 'N/A')}"
                 context_parts.append(f"{source_ref.upper()}:\n{content['content']}")
             
             sources_info.append({
                 "reference": source_ref,
-                "similarity": content['similarity_score'],
+                "similarity": cosine_similarity(content),
                 "type": metadata['type']
             })
         
@@ -206,26 +274,19 @@ class OpenAIAgent:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.3
-            )
-            
-            response_text = response.choices[0].message.content
+            response_text = self._complete([
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ], on_delta)
             logger.info(f"Respuesta generada exitosamente para consulta sobre: {intent_analysis['type']}")
             return response_text
             
         except Exception as e:
             logger.error(f"Error generando respuesta: {e}")
-            return f"Lo siento, ocurrió un error al procesar tu consulta: {str(e)}"
+            return f"{GENERATION_ERROR}{str(e)}"
     
-    def generate_summary(self, content: List[Dict[str, Any]], topic: str) -> str:
-        """Genera un resumen de múltiples artículos sobre un tema específico"""
+    def generate_summary(self, content: List[Dict[str, Any]], topic: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """Genera un resumen de múltiples artículos sobre un tema específico (en streaming con on_delta)"""
         
         if not content:
             return "No se encontró información suficiente para generar un resumen."
@@ -234,7 +295,7 @@ class OpenAIAgent:
         articles_text = []
         for item in content:
             metadata = item['metadata']
-            if metadata['type'] == 'article':
+            if metadata['type'] in ('article', 'chunk'):
                 articles_text.append(f"Artículo {metadata['article_number']}: {item['content']}")
         
         if not articles_text:
@@ -263,62 +324,122 @@ class OpenAIAgent:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": summary_prompt}],
-                max_tokens=1500,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content
+            return self._complete([{"role": "user", "content": summary_prompt}], on_delta)
             
         except Exception as e:
             logger.error(f"Error generando resumen: {e}")
-            return f"Error al generar resumen: {str(e)}"
+            return f"{SUMMARY_ERROR}{str(e)}"
     
-    def process_query(self, query: str, generate_summary_if_multiple: bool = True) -> QueryResult:
-        """Procesa una consulta completa del usuario"""
+    def process_query(self, query: str, generate_summary_if_multiple: bool = True,
+                      on_delta: Optional[Callable[[str], None]] = None) -> QueryResult:
+        """Procesa una consulta completa del usuario.
+        
+        Con on_delta, la respuesta se entrega por fragmentos a medida que se genera;
+        las que no pasan por el LLM (caché, artículos pedidos, sin resultados) llegan
+        en un solo fragmento.
+        """
         start_time = datetime.now()
+        timer = StageTimer()
+        emit = DeltaRecorder(on_delta) if on_delta is not None else None
+        context_tokens = 0
         
         try:
-            # 1. Analizar intención
-            intent_analysis = self.analyze_intent(query)
+            # Los artículos citados por número se leen del índice en memoria, sin búsqueda vectorial
+            with timer.stage("references"):
+                references = parse_article_references(query)
+                relevant_content = self.vector_store.get_articles(references) if references else []
+                direct_lookup = bool(references) and is_direct_lookup(query)
+            
+            # Pregunta ya respondida (o casi idéntica): se reutiliza la respuesta sin llamar al LLM
+            if not direct_lookup:
+                cached = timer.run("answer_cache", self.answer_cache.get, query)
+                if cached is not None:
+                    result, cache_hit = cached
+                    if emit is not None:
+                        emit(result.response)
+                    return replace(
+                        result,
+                        query=query,
+                        timestamp=start_time,
+                        processing_time=(datetime.now() - start_time).total_seconds(),
+                        timings=timer.durations,
+                        cache_hit=cache_hit,
+                        context_tokens=0,
+                        time_to_first_text=emit.first_text if emit is not None else None
+                    )
             
-            # 2. Buscar contenido relevante
-            relevant_content = self.search_relevant_content(query, intent_analysis)
+            if relevant_content:
+                intent_analysis = reference_intent(references)
+            elif not direct_lookup:
+                # 1. Analizar intención; la búsqueda de la consulta original no depende de ella y corre en paralelo
+                initial_results = None
+                if settings.CONCURRENT_RETRIEVAL:
+                    with timer.stage("intent_and_retrieval"):
+                        initial_search = self.executor.submit(timer.run, "retrieval", self.search_initial, query)
+                        intent_analysis = timer.run("intent", self.analyze_intent, query)
+                        initial_results = initial_search.result()
+                    timer.overlap("intent_and_retrieval", "intent", "retrieval")
+                else:
+                    intent_analysis = timer.run("intent", self.analyze_intent, query)
+                
+                # 2. Buscar contenido relevante: términos sugeridos y recorte según la especificidad
+                relevant_content = timer.run("search", self.search_relevant_content, query, intent_analysis, initial_results)
             
-            if not relevant_content:
+            if direct_lookup:
+                # Solo se pidió el texto de los artículos: no hace falta el LLM
+                response = format_articles(relevant_content, references)
+            elif not relevant_content:
                 response = "No encontré información relevante sobre tu consulta en la Ley 2381 de 2024. ¿Podrías reformular tu pregunta o ser más específico?"
-                sources = []
             else:
-                # 3. Generar respuesta
-                if len(relevant_content) > 3 and generate_summary_if_multiple and intent_analysis['specificity'] == 'low':
-                    # Para consultas generales con muchos resultados, generar resumen
-                    response = self.generate_summary(relevant_content, query)
-                else:
-                    # Respuesta normal
-                    response = self.generate_response(query, relevant_content, intent_analysis)
+                # 3. Ajustar el contexto al presupuesto de tokens (las fuentes son los fragmentos que lo integran)
+                packed = timer.run("context_packing", pack_context, relevant_content)
+                relevant_content = packed.items
+                context_tokens = packed.tokens
                 
-                # Preparar información de fuentes
-                sources = []
-                for content in relevant_content:
-                    metadata = content['metadata']
-                    if metadata['type'] == 'article':
-                        sources.append({
-                            "reference": f"Artículo {metadata['article_number']}",
-                            "similarity_score": content['similarity_score'],
-                            "type": "article"
-                        })
+                # 4. Generar respuesta
+                with timer.stage("generation"):
+                    if len(relevant_content) > 3 and generate_summary_if_multiple and intent_analysis['specificity'] == 'low':
+                        # Para consultas generales con muchos resultados, generar resumen
+                        response = self.generate_summary(relevant_content, query, on_delta=emit)
+                    else:
+                        # Respuesta normal
+                        response = self.generate_response(query, relevant_content, intent_analysis, on_delta=emit)
+            
+            if emit is not None and emit.first_text is None:
+                emit(response)
+            
+            # Preparar información de fuentes
+            sources = []
+            seen_articles = set()
+            for content in relevant_content:
+                metadata = content['metadata']
+                # Varios fragmentos del mismo artículo cuentan como una sola fuente
+                if metadata['type'] in ('article', 'chunk') and metadata['article_number'] not in seen_articles:
+                    seen_articles.add(metadata['article_number'])
+                    sources.append({
+                        "reference": f"Artículo {metadata['article_number']}",
+                        "similarity_score": cosine_similarity(content),  # Coseno, no la puntuación RRF
+                        "type": "article"
+                    })
             
             processing_time = (datetime.now() - start_time).total_seconds()
+            first_text = f", primer texto en {emit.first_text:.2f}s" if emit is not None and emit.first_text is not None else ""
+            logger.info(f"Consulta procesada en {processing_time:.2f}s{first_text}, {context_tokens} tokens de contexto: {timer.format()}")
             
-            return QueryResult(
+            result = QueryResult(
                 response=response,
                 sources=sources,
                 query=query,
                 timestamp=start_time,
-                processing_time=processing_time
+                processing_time=processing_time,
+                timings=timer.durations,
+                time_to_first_text=emit.first_text if emit is not None else None,
+                context_tokens=context_tokens
             )
+            if relevant_content and not direct_lookup and not response.startswith((GENERATION_ERROR, SUMMARY_ERROR)):
+                self.answer_cache.put(query, result)
+            
+            return result
             
         except Exception as e:
             logger.error(f"Error procesando consulta: {e}")
@@ -331,6 +452,10 @@ class OpenAIAgent:
                 timestamp=start_time,
                 processing_time=processing_time
             )
+    
+    def stream_query(self, query: str) -> QueryStream:
+        """La respuesta como iterador asíncrono de fragmentos de texto; al terminar, `stream.result` tiene el QueryResult"""
+        return QueryStream(lambda on_delta: self.process_query(query, on_delta=on_delta))
 
 def main():
     """Función principal para testing"""
@@ -366,7 +491,8 @@ def main():
         if result.sources:
             print(f"\n📚 Referencias:")
             for source in result.sources:
-                print(f"   - {source['reference']} (relevancia: {source['similarity_score']:.3f})")
+                similarity = source['similarity_score']
+                print(f"   - {source['reference']} (similitud: {f'{similarity:.3f}' if similarity is not None else 'solo BM25'})")
         
         print("\n" + "=" * 50)
 
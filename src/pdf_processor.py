@@ -1,31 +1,55 @@
-import re
 import json
+import hashlib
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Any
 import pdfplumber
+from pdfminer.pdftypes import resolve1
 from loguru import logger
 
 # Agregar el directorio raíz al path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.settings import settings
+from src.law_segmenter import LawSegmenter, ARTICLE_HEADER_PATTERN
+from src.corpus_store import write_corpus
+
+# Se incrementa cuando cambia el formato de los bloques segmentados en caché
+CACHE_VERSION = 2
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _extract_page_range(pdf_path: str, page_indices: List[int]) -> List[Tuple[int, Optional[str], float]]:
+    """Extrae un bloque de páginas (se ejecuta dentro de un proceso del pool)"""
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for index in page_indices:
+            start = time.perf_counter()
+            text = pdf.pages[index].extract_text()
+            results.append((index, text, time.perf_counter() - start))
+    return results
 
 class LawPDFProcessor:
-    def __init__(self):
-        self.pdf_path = settings.LAW_PDF_PATH
-        self.output_dir = settings.PROCESSED_DATA_DIR
+    def __init__(self, pdf_path: Optional[Path] = None, output_dir: Optional[Path] = None):
+        self.pdf_path = Path(pdf_path or settings.LAW_PDF_PATH)
+        self.output_dir = Path(output_dir or settings.PROCESSED_DATA_DIR)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_path = self.output_dir / settings.EXTRACTION_CACHE_PATH.name
+        self.corpus_path = self.output_dir / settings.CORPUS_PATH.name
+        self.segmenter = LawSegmenter()
+        self.page_timings: List[Dict[str, float]] = []
         
-    def extract_text_from_pdf(self) -> str:
-        """Extrae todo el texto del PDF"""
+    def extract_text_from_pdf(self, parallel: Optional[bool] = None, workers: Optional[int] = None) -> str:
+        """Extrae todo el texto del PDF, opcionalmente repartiendo las páginas en un pool de procesos"""
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                full_text = ""
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
-                        
+            page_texts = self._extract_pages(None, parallel=parallel, workers=workers)
+            full_text = self._join_pages(page_texts)
+            
+            self._log_page_timings()
             logger.info(f"Texto extraído exitosamente. Longitud: {len(full_text)} caracteres")
             return full_text
             
@@ -33,101 +57,199 @@ class LawPDFProcessor:
             logger.error(f"Error extrayendo texto del PDF: {e}")
             raise
     
-    def segment_by_articles(self, text: str) -> List[Dict[str, str]]:
-        """Segmenta el texto por artículos"""
-        articles = []
-        seen_articles = set()  # Para evitar duplicados
+    @staticmethod
+    def _join_pages(page_texts: List[Optional[str]]) -> str:
+        """Reconstruye el texto en orden de página sin concatenación cuadrática"""
+        return "".join(text + "\n" for text in page_texts if text)
+    
+    def _extract_pages(self, page_indices: Optional[List[int]], parallel: Optional[bool] = None,
+                       workers: Optional[int] = None) -> List[Optional[str]]:
+        """Extrae las páginas indicadas (todas si es None) en el orden recibido"""
+        if parallel is None:
+            parallel = settings.PDF_PARALLEL_EXTRACTION
         
-        # Patrones para detectar artículos
-        article_pattern = r'ARTÍCULO\s+(\d+)\.?\s*(.*?)(?=ARTÍCULO\s+\d+|$)'
+        if page_indices is None:
+            with pdfplumber.open(self.pdf_path) as pdf:
+                page_indices = list(range(len(pdf.pages)))
         
-        matches = re.finditer(article_pattern, text, re.DOTALL | re.IGNORECASE)
+        if not page_indices:
+            self.page_timings = []
+            return []
         
-        for match in matches:
-            article_number = match.group(1)
-            article_content = match.group(2).strip()
-            
-            # Verificar si ya procesamos este artículo
-            if article_number in seen_articles:
-                logger.warning(f"Artículo {article_number} duplicado - omitiendo")
-                continue
-                
-            # Limpiar el contenido
-            article_content = re.sub(r'\n+', ' ', article_content)
-            article_content = re.sub(r'\s+', ' ', article_content)
-            
-            if len(article_content) > 50:  # Filtrar artículos muy cortos
-                articles.append({
-                    "article_number": article_number,
-                    "content": article_content,
-                    "type": "article"
-                })
-                seen_articles.add(article_number)
-                
-        logger.info(f"Se encontraron {len(articles)} artículos únicos")
+        if parallel:
+            return self._extract_pages_parallel(page_indices, workers)
+        return self._extract_pages_serial(page_indices)
+    
+    def _extract_pages_serial(self, page_indices: List[int]) -> List[Optional[str]]:
+        """Extrae las páginas una a una en el proceso actual"""
+        page_texts = []
+        self.page_timings = []
+        
+        for index, text, seconds in _extract_page_range(str(self.pdf_path), page_indices):
+            page_texts.append(text)
+            self.page_timings.append({"page": index + 1, "seconds": seconds})
+        
+        return page_texts
+    
+    def _extract_pages_parallel(self, page_indices: List[int], workers: Optional[int] = None) -> List[Optional[str]]:
+        """Extrae las páginas repartidas en bloques contiguos entre varios procesos"""
+        total_pages = len(page_indices)
+        workers = workers or settings.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+        workers = max(1, min(workers, total_pages))
+        
+        # Bloques contiguos: cada proceso abre el PDF una sola vez
+        chunk_size = -(-total_pages // workers)
+        chunks = [page_indices[start:start + chunk_size] for start in range(0, total_pages, chunk_size)]
+        
+        logger.info(f"Extrayendo {total_pages} páginas en paralelo con {len(chunks)} procesos")
+        
+        page_texts: List[Optional[str]] = []
+        self.page_timings = []
+        
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [executor.submit(_extract_page_range, str(self.pdf_path), chunk) for chunk in chunks]
+            # Los futuros se recorren en orden de envío, así que el orden de página se conserva
+            for future in futures:
+                for index, text, seconds in future.result():
+                    page_texts.append(text)
+                    self.page_timings.append({"page": index + 1, "seconds": seconds})
+        
+        return page_texts
+    
+    def _log_page_timings(self):
+        """Reporta los tiempos de extracción por página"""
+        if not self.page_timings:
+            return
+        
+        total = sum(timing["seconds"] for timing in self.page_timings)
+        slowest = max(self.page_timings, key=lambda timing: timing["seconds"])
+        logger.info(
+            f"Tiempo de extracción: {total:.2f}s acumulados en {len(self.page_timings)} páginas "
+            f"(más lenta: página {slowest['page']} con {slowest['seconds']:.3f}s)"
+        )
+        for timing in self.page_timings:
+            logger.debug(f"Página {timing['page']}: {timing['seconds']:.3f}s")
+    
+    def segment_by_articles(self, text: str) -> List[Dict[str, str]]:
+        """Segmenta el texto por artículos"""
+        articles, _, _ = self.segmenter.segment(text)
         return articles
     
     def extract_chapters_and_titles(self, text: str) -> List[Dict[str, str]]:
         """Extrae capítulos y títulos para contexto adicional"""
-        sections = []
-        seen_sections = set()  # Para evitar duplicados
+        _, sections, _ = self.segmenter.segment(text)
+        return sections
+    
+    def _split_into_blocks(self, text: str) -> List[Tuple[int, str]]:
+        """Divide el texto en bloques (offset, texto) que empiezan en cada encabezado de artículo.
         
-        # Patrones para capítulos y títulos
-        patterns = [
-            (r'CAPÍTULO\s+([IVX\d]+)\.?\s*(.*?)(?=CAPÍTULO|ARTÍCULO|$)', "chapter"),
-            (r'TÍTULO\s+([IVX\d]+)\.?\s*(.*?)(?=TÍTULO|CAPÍTULO|ARTÍCULO|$)', "title"),
-        ]
+        Ningún segmento cruza el inicio de un encabezado de artículo, así que
+        segmentar bloque a bloque da el mismo resultado que segmentar el texto completo.
+        """
+        starts = [match.start() for match in ARTICLE_HEADER_PATTERN.finditer(text)]
+        bounds = [0] + [start for start in starts if start > 0] + [len(text)]
+        return [(bounds[i], text[bounds[i]:bounds[i + 1]]) for i in range(len(bounds) - 1)]
+    
+    def _segment_incremental(self, text: str, cached_blocks: Dict[str, List[Dict]]) -> Tuple[List[Dict], List[Dict], Dict[str, Any], Dict[str, List[Dict]]]:
+        """Segmenta reutilizando los bloques cuyo hash ya está en la caché"""
+        segmented = []
+        blocks = {}
+        resegmented = 0
         
-        for pattern, section_type in patterns:
-            matches = re.finditer(pattern, text, re.DOTALL | re.IGNORECASE)
+        for base, block in self._split_into_blocks(text):
+            block_hash = _sha256(block.encode('utf-8'))
             
-            for match in matches:
-                number = match.group(1)
-                content = match.group(2).strip()
-                
-                # Crear ID único
-                section_id = f"{section_type}_{number}"
-                
-                # Verificar duplicados
-                if section_id in seen_sections:
-                    logger.warning(f"Sección {section_id} duplicada - omitiendo")
-                    continue
-                
-                # Limpiar contenido
-                content = re.sub(r'\n+', ' ', content)
-                content = re.sub(r'\s+', ' ', content)
-                
-                if len(content) > 20:
-                    sections.append({
-                        "section_number": number,
-                        "content": content,
-                        "type": section_type
-                    })
-                    seen_sections.add(section_id)
-        
-        logger.info(f"Se encontraron {len(sections)} secciones únicas")
-        return sections
+            if block_hash in cached_blocks:
+                segments = cached_blocks[block_hash]
+            else:
+                segments = self.segmenter.segment_block(block)
+                resegmented += 1
+            
+            blocks[block_hash] = segments
+            segmented.append((base, segments))
+        
+        logger.info(f"Bloques re-segmentados: {resegmented} de {len(segmented)}")
+        articles, sections, structure = self.segmenter.assemble(segmented)
+        return articles, sections, structure, blocks
+    
+    def _hash_pages(self) -> List[str]:
+        """Calcula un hash por página a partir de sus flujos de contenido, sin extraer texto"""
+        page_hashes = []
+        
+        with pdfplumber.open(self.pdf_path) as pdf:
+            for page in pdf.pages:
+                digest = hashlib.sha256(repr(page.page_obj.mediabox).encode('utf-8'))
+                for stream in page.page_obj.contents:
+                    digest.update(resolve1(stream).get_rawdata() or b"")
+                page_hashes.append(digest.hexdigest())
+        
+        return page_hashes
+    
+    def _load_cache(self) -> Dict[str, Any]:
+        """Carga la caché de extracción; una caché ilegible se trata como vacía"""
+        if not self.cache_path.exists():
+            return {}
+        
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Caché de extracción inválida, se ignora: {e}")
+            return {}
+        
+        if cache.get("version") != CACHE_VERSION:
+            logger.info("Caché de extracción de una versión anterior, se ignora")
+            return {}
+        return cache
+    
+    def _save_cache(self, cache: Dict[str, Any]):
+        """Guarda la caché de extracción de forma atómica"""
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        tmp_path.replace(self.cache_path)
     
-    def process_pdf(self) -> Dict[str, List[Dict]]:
-        """Procesa completamente el PDF y retorna los segmentos"""
+    def process_pdf(self, parallel: Optional[bool] = None, workers: Optional[int] = None,
+                    force: bool = False) -> Dict[str, List[Dict]]:
+        """Procesa el PDF y retorna los segmentos, reutilizando la caché de páginas y bloques"""
         if not self.pdf_path.exists():
             raise FileNotFoundError(f"No se encontró el archivo PDF: {self.pdf_path}")
         
+        output_file = self.output_dir / "processed_law.json"
+        pdf_hash = _sha256(self.pdf_path.read_bytes())
+        cache = {} if force else self._load_cache()
+        
+        # PDF sin cambios: no hay nada que hacer
+        if cache.get("pdf_hash") == pdf_hash and output_file.exists():
+            logger.info(f"PDF sin cambios ({pdf_hash[:12]}). Se reutiliza: {output_file}")
+            with open(output_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        
         logger.info("Iniciando procesamiento del PDF...")
         
-        # Extraer texto
-        full_text = self.extract_text_from_pdf()
+        # Extraer solo las páginas que no están en caché
+        page_hashes = self._hash_pages()
+        cached_pages = cache.get("pages", {})
+        missing = [index for index, page_hash in enumerate(page_hashes) if page_hash not in cached_pages]
         
-        # Segmentar por artículos
-        articles = self.segment_by_articles(full_text)
+        logger.info(f"Páginas a extraer: {len(missing)} de {len(page_hashes)}")
+        extracted = dict(zip(missing, self._extract_pages(missing, parallel=parallel, workers=workers)))
+        self._log_page_timings()
         
-        # Extraer secciones adicionales
-        sections = self.extract_chapters_and_titles(full_text)
+        page_texts = [
+            extracted[index] if index in extracted else cached_pages[page_hash]
+            for index, page_hash in enumerate(page_hashes)
+        ]
+        full_text = self._join_pages(page_texts)
+        
+        # Segmentar solo los bloques de artículos afectados
+        articles, sections, structure, blocks = self._segment_incremental(full_text, cache.get("blocks", {}))
         
         # Combinar todo
         processed_data = {
             "articles": articles,
             "sections": sections,
+            "structure": structure,
             "metadata": {
                 "total_articles": len(articles),
                 "total_sections": len(sections),
@@ -136,19 +258,34 @@ class LawPDFProcessor:
         }
         
         # Guardar resultado
-        output_file = self.output_dir / "processed_law.json"
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(processed_data, f, ensure_ascii=False, indent=2)
+        write_corpus(processed_data, self.corpus_path, source_json=output_file)
+        
+        self._save_cache({
+            "version": CACHE_VERSION,
+            "pdf_hash": pdf_hash,
+            "pages": dict(zip(page_hashes, page_texts)),
+            "blocks": blocks
+        })
         
         logger.info(f"Procesamiento completado. Datos guardados en: {output_file}")
         return processed_data
 
 def main():
     """Función principal para testing"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Procesa el PDF de la Ley 2381 de 2024")
+    parser.add_argument("--parallel", action="store_true", help="Extrae las páginas en un pool de procesos")
+    parser.add_argument("--workers", type=int, default=None, help="Número de procesos para la extracción paralela")
+    parser.add_argument("--force", action="store_true", help="Ignora la caché y reprocesa todas las páginas")
+    args = parser.parse_args()
+    
     processor = LawPDFProcessor()
     
     try:
-        result = processor.process_pdf()
+        result = processor.process_pdf(parallel=args.parallel or None, workers=args.workers, force=args.force)
         print(f"✅ Procesamiento exitoso:")
         print(f"   - Artículos encontrados: {result['metadata']['total_articles']}")
         print(f"   - Secciones encontradas: {result['metadata']['total_sections']}")
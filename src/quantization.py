@@ -0,0 +1,87 @@
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Bits en 1 de cada byte, para numpy sin np.bitwise_count (< 2.0)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+def _popcount(codes: np.ndarray) -> np.ndarray:
+    return np.bitwise_count(codes) if hasattr(np, "bitwise_count") else _POPCOUNT[codes]
+
+def _top_rows(scores: np.ndarray, size: int) -> np.ndarray:
+    """Índices de las `size` columnas de mayor puntuación por fila, sin ordenar"""
+    if size >= scores.shape[1]:
+        return np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    return np.argpartition(-scores, size - 1, axis=1)[:, :size]
+
+def spill(matrix: np.ndarray) -> np.ndarray:
+    """Copia la matriz a un archivo temporal mapeado en memoria.
+
+    Las filas solo ocupan memoria residente mientras el sistema las tenga en
+    caché; el reordenamiento lee únicamente las de la lista corta.
+    """
+    spilled = np.memmap(tempfile.TemporaryFile(), dtype=matrix.dtype, mode='w+', shape=matrix.shape)
+    spilled[:] = matrix
+    spilled.flush()
+    return spilled
+
+class QuantizedEmbeddings:
+    """Códigos compactos de una matriz de embeddings normalizados, para preseleccionar candidatos.
+
+    - int8: cuantización escalar simétrica por dimensión (4 veces menos que float32).
+    - binary: un bit de signo por dimensión, comparado por distancia de Hamming (32 veces menos).
+
+    Los códigos solo eligen una lista corta; la puntuación final la calcula el
+    motor con los embeddings float de esas filas.
+    """
+
+    def __init__(self, mode: str, codes: np.ndarray, scale: Optional[np.ndarray] = None):
+        self.mode = mode
+        self.codes = codes
+        self.scale = scale
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, mode: Optional[str] = None) -> "QuantizedEmbeddings":
+        mode = mode or settings.EMBEDDING_QUANTIZATION
+        if mode == "int8":
+            scale = np.maximum(np.abs(matrix).max(axis=0), 1e-12).astype(np.float32) / 127
+            codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+            return cls(mode, codes, scale)
+        if mode == "binary":
+            return cls(mode, np.packbits(matrix > 0, axis=1))
+        raise ValueError(f"Modo de cuantización desconocido: {mode} (opciones: int8, binary)")
+
+    def shortlist(self, queries: np.ndarray, size: int, block_size: int = 256) -> np.ndarray:
+        """Filas candidatas (consultas × size) según la similitud aproximada"""
+        if self.mode == "binary":
+            query_codes = np.packbits(queries > 0, axis=1)
+            # Similitud = -distancia de Hamming
+            scores = np.stack([
+                -_popcount(self.codes ^ query_code).sum(axis=1, dtype=np.int32) for query_code in query_codes
+            ])
+            return _top_rows(scores, size)
+
+        # int8 asimétrico: la consulta queda en float y la escala se aplica a ella;
+        # los códigos se convierten por bloques pequeños, que caben en caché
+        scaled = queries * self.scale
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), block_size):
+            block = self.codes[start:start + block_size].astype(np.float32)
+            scores[:, start:start + len(block)] = scaled @ block.T
+        return _top_rows(scores, size)
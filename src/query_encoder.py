@@ -0,0 +1,203 @@
+import sys
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+# Consultas típicas para verificar que el encoder ONNX coincide con el de torch
+AGREEMENT_QUERIES = [
+    "¿Cuántas semanas necesito para pensionarme?",
+    "¿Qué es el pilar solidario?",
+    "¿Cuál es la edad de pensión para mujeres?",
+    "pensión de vejez",
+    "artículo 12",
+    "¿Qué pasa con mis aportes en un fondo privado si me traslado a Colpensiones?",
+    "Requisitos del régimen de transición para quienes tienen 750 semanas cotizadas",
+    "renta básica solidaria",
+]
+
+CONFIG_FILE = "encoder_config.json"
+POOLING_MODES = ("mean", "cls")
+
+class OnnxQueryEncoder:
+    """Encoder de consultas sobre ONNX Runtime, sin importar torch.
+
+    Reproduce el SentenceTransformer exportado con export_onnx (transformer,
+    pooling y normalización opcional) y expone el mismo encode(), así que el
+    vector store lo usa en lugar del modelo de torch para las consultas.
+    """
+
+    def __init__(self, model_dir: Optional[Path] = None, quantized: Optional[bool] = None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir or settings.ONNX_ENCODER_DIR)
+        with open(self.model_dir / CONFIG_FILE, 'r', encoding='utf-8') as f:
+            self.config: Dict[str, Any] = json.load(f)
+
+        if self.config["embedding_model"] != settings.EMBEDDING_MODEL:
+            raise ValueError(
+                f"El encoder ONNX se exportó de {self.config['embedding_model']} y el proyecto usa "
+                f"{settings.EMBEDDING_MODEL}: reexpórtalo con python -m src.query_encoder"
+            )
+
+        quantized = settings.ONNX_QUANTIZED if quantized is None else quantized
+        self.model_path = self.model_dir / ("model.int8.onnx" if quantized else "model.onnx")
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"])
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(str(self.model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimensions"]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Embeddings float32 de los textos, como SentenceTransformer.encode"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = [self._encode_batch(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, self.config["dimensions"]), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+
+        if self.config["pooling"] == "cls":
+            embeddings = hidden[:, 0]
+        else:
+            mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+            embeddings = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if self.config["normalize"]:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype(np.float32)
+
+def cosine_agreement(reference, candidate, sentences: Optional[List[str]] = None) -> Dict[str, float]:
+    """Similitud coseno entre los embeddings de dos encoders para las mismas frases"""
+    sentences = sentences or AGREEMENT_QUERIES
+    expected = np.asarray(reference.encode(sentences, show_progress_bar=False), dtype=np.float32)
+    actual = np.asarray(candidate.encode(sentences, show_progress_bar=False), dtype=np.float32)
+    cosines = (expected * actual).sum(axis=1) / (np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    return {"min": round(float(cosines.min()), 5), "mean": round(float(cosines.mean()), 5)}
+
+def export_onnx(output_dir: Optional[Path] = None, quantize: bool = True) -> Dict[str, Any]:
+    """Exporta el modelo de embeddings a ONNX (y a int8 con cuantización dinámica) y verifica la concordancia.
+
+    Requiere torch y sentence-transformers solo aquí, en la exportación; el
+    encoder resultante se usa sin ellos.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir or settings.ONNX_ENCODER_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+    transformer, pooling = model[0], model[1]
+    pooling_mode = getattr(pooling, 'pooling_mode', None) or pooling.get_pooling_mode_str()
+    if pooling_mode not in POOLING_MODES:
+        raise ValueError(f"Pooling no soportado para ONNX: {pooling_mode} (opciones: {', '.join(POOLING_MODES)})")
+
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(str(output_dir))
+    sample = tokenizer(["pensión de vejez"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer.auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            str(output_dir / "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(str(output_dir / "model.onnx"), str(output_dir / "model.int8.onnx"), weight_type=QuantType.QInt8)
+
+    config = {
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "dimensions": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pad_token_id": tokenizer.pad_token_id,
+        "pooling": pooling_mode,
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "agreement": {}
+    }
+    # Se escribe antes de verificar porque OnnxQueryEncoder la lee; luego se completa con la concordancia
+    with open(output_dir / CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+    # Cada variante debe reproducir los embeddings de torch; si no, no se puede usar contra el índice existente
+    variants = [("fp32", False)] + ([("int8", True)] if quantize else [])
+    for variant, quantized in variants:
+        agreement = cosine_agreement(model, OnnxQueryEncoder(output_dir, quantized=quantized))
+        config["agreement"][variant] = agreement
+        if agreement["min"] < settings.ONNX_MIN_AGREEMENT:
+            raise ValueError(
+                f"El encoder ONNX {variant} no coincide con torch: coseno mínimo {agreement['min']} "
+                f"< {settings.ONNX_MIN_AGREEMENT}"
+            )
+
+    with open(output_dir / CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Encoder ONNX exportado en {output_dir}: {config['agreement']}")
+    return config
+
+def main():
+    """Exporta el encoder de consultas a ONNX"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exporta el modelo de embeddings a ONNX para codificar consultas sin torch")
+    parser.add_argument("output", nargs="?", type=Path, default=None, help="Directorio de salida")
+    parser.add_argument("--no-quantize", action="store_true", help="No generar la variante int8")
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        config = export_onnx(args.output, quantize=not args.no_quantize)
+
+        print(f"✅ Encoder ONNX exportado en {time.perf_counter() - start:.1f}s")
+        print(f"   - Modelo: {config['embedding_model']} ({config['dimensions']} dimensiones, pooling {config['pooling']})")
+        for variant, agreement in config['agreement'].items():
+            print(f"   - Concordancia {variant} con torch: coseno mínimo {agreement['min']}, medio {agreement['mean']}")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from src.cache import LRUCache, normalize_query
+
+class CrossEncoderReranker:
+    """Reordena una lista acotada de candidatos con un cross-encoder local.
+
+    El cross-encoder lee la consulta y el fragmento juntos, así que su puntuación
+    (una probabilidad de relevancia entre 0 y 1) es mucho más confiable que la
+    similitud del bi-encoder y permite enviar al LLM solo los 2-3 fragmentos que
+    la superan. Las puntuaciones se cachean por (hash de la consulta, ID del documento).
+    """
+
+    def __init__(self, model_name: Optional[str] = None, max_candidates: Optional[int] = None, cache_size: Optional[int] = None):
+        self.model_name = model_name or settings.RERANKER_MODEL
+        self.max_candidates = max_candidates or settings.RERANK_CANDIDATES
+        self.score_cache = LRUCache(settings.RERANK_CACHE_SIZE if cache_size is None else cache_size)
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Cross-encoder; se carga en el primer uso"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                    logger.info(f"Cross-encoder cargado: {self.model_name}")
+        return self._model
+
+    @staticmethod
+    def query_hash(query: str) -> str:
+        return hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()[:16]
+
+    def scores(self, query: str, candidates: List[Dict[str, Any]]) -> List[float]:
+        """Puntuación de relevancia de cada candidato; solo se evalúan los pares que no están en caché"""
+        query_hash = self.query_hash(query)
+        keys = [(query_hash, candidate['id']) for candidate in candidates]
+        scores = [self.score_cache.get(key) for key in keys]
+
+        missing = [position for position, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self.model.predict(
+                [(query, candidates[position]['content']) for position in missing],
+                show_progress_bar=False
+            )
+            for position, score in zip(missing, predicted):
+                scores[position] = float(score)
+                self.score_cache.put(keys[position], scores[position])
+
+        return scores
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], top_k: Optional[int] = None,
+               min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Los top_k candidatos con puntuación de al menos min_score (como mínimo el mejor), con 'rerank_score'"""
+        top_k = top_k or settings.RERANK_TOP_K
+        min_score = settings.RERANK_MIN_SCORE if min_score is None else min_score
+
+        candidates = candidates[:self.max_candidates]
+        if not candidates:
+            return []
+
+        ranked = sorted(
+            ({**candidate, 'rerank_score': score} for candidate, score in zip(candidates, self.scores(query, candidates))),
+            key=lambda candidate: candidate['rerank_score'],
+            reverse=True
+        )
+        selected = [candidate for candidate in ranked[:top_k] if candidate['rerank_score'] >= min_score]
+        return selected or ranked[:1]
+
+    def clear(self):
+        """Descarta las puntuaciones cacheadas (los documentos cambiaron)"""
+        self.score_cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model_name, "max_candidates": self.max_candidates, "score_cache": self.score_cache.stats()}
@@ -0,0 +1,158 @@
+import re
+import sys
+import json
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional
+import numpy as np
+from loguru import logger
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import settings
+
+# Números (con decimales y porcentaje: "1.300", "20%") o palabras
+TOKEN_PATTERN = re.compile(r'\d+(?:[.,]\d+)*%?|[^\W\d_]+')
+
+STOPWORDS = frozenset(
+    "a al ante con de del desde e el en entre es la las lo los o para por que se según sin sobre su sus "
+    "un una uno y cual cuales como cuando este esta estos estas ese esa dicho dicha le les no".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Términos para el índice: minúsculas, sin tildes y sin palabras vacías"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+class BM25Index:
+    """Índice invertido BM25 con listas de postings en arreglos contiguos.
+
+    Las postings de cada término son un tramo de `docs`/`weights` delimitado por
+    `offsets` (formato CSR), y `weights` guarda el peso BM25 completo (IDF por
+    saturación de la frecuencia normalizada por longitud). Puntuar una consulta es
+    sumar tramos de pesos, sin recalcular nada por documento. Guarda además el
+    texto y los metadatos, para que la búsqueda híbrida no tenga que leerlos de Chroma.
+    """
+
+    def __init__(self, k1: Optional[float] = None, b: Optional[float] = None):
+        self.k1 = settings.BM25_K1 if k1 is None else k1
+        self.b = settings.BM25_B if b is None else b
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self.vocabulary: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> "BM25Index":
+        """Construye el índice a partir de los textos de los documentos"""
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc, counts in enumerate(term_counts):
+            for term, frequency in counts.items():
+                postings.setdefault(term, []).append((doc, frequency))
+
+        self._set_documents(list(ids), list(texts), list(metadatas) if metadatas is not None else [{} for _ in ids])
+        self.vocabulary = {term: index for index, term in enumerate(sorted(postings))}
+        self.offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        self.docs = np.empty(sum(len(entries) for entries in postings.values()), dtype=np.int32)
+        frequencies = np.empty(len(self.docs), dtype=np.float32)
+
+        position = 0
+        for term, index in self.vocabulary.items():
+            entries = postings[term]
+            self.docs[position:position + len(entries)] = [doc for doc, _ in entries]
+            frequencies[position:position + len(entries)] = [frequency for _, frequency in entries]
+            position += len(entries)
+            self.offsets[index + 1] = position
+
+        document_frequency = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log(1 + (len(self.ids) - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+        term_of_posting = np.repeat(np.arange(len(self.vocabulary)), np.diff(self.offsets))
+        normalization = self.k1 * (1 - self.b + self.b * lengths[self.docs] / max(average_length, 1e-9))
+        self.weights = (self.idf[term_of_posting] * frequencies * (self.k1 + 1) / (frequencies + normalization)).astype(np.float32)
+
+        logger.info(f"Índice BM25 construido: {len(self.ids)} documentos, {len(self.vocabulary)} términos")
+        return self
+
+    def _set_documents(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self._positions = {doc_id: position for position, doc_id in enumerate(ids)}
+
+    def document(self, doc_id: str) -> Tuple[str, Dict[str, Any]]:
+        """Texto y metadatos de un documento del índice"""
+        position = self._positions[doc_id]
+        return self.texts[position], self.metadatas[position]
+
+    def scores(self, query: str) -> np.ndarray:
+        """Puntuación BM25 de la consulta para cada documento"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in dict.fromkeys(tokenize(query)):
+            index = self.vocabulary.get(term)
+            if index is not None:
+                start, end = self.offsets[index], self.offsets[index + 1]
+                # Un documento aparece una sola vez en las postings de un término
+                scores[self.docs[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Los n_results documentos con mayor puntuación (solo los que contienen algún término)"""
+        scores = self.scores(query)
+        k = min(n_results, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[doc], float(scores[doc])) for doc in top]
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Guarda el índice en un .npz (sin pickle)"""
+        path = Path(path or settings.BM25_INDEX_PATH)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+
+        # Escritura atómica; np.savez agrega ".npz" si el nombre no lo tiene
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            ids=np.array(self.ids, dtype=str),
+            documents=np.array(json.dumps({"texts": self.texts, "metadatas": self.metadatas}, ensure_ascii=False)),
+            terms=np.array(terms, dtype=str),
+            offsets=self.offsets,
+            docs=self.docs,
+            weights=self.weights,
+            idf=self.idf,
+            params=np.array([self.k1, self.b], dtype=np.float64)
+        )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "BM25Index":
+        """Carga un índice guardado con save()"""
+        with np.load(Path(path or settings.BM25_INDEX_PATH), allow_pickle=False) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            documents = json.loads(data["documents"].item())
+            index._set_documents(data["ids"].tolist(), documents["texts"], documents["metadatas"])
+            index.vocabulary = {term: position for position, term in enumerate(data["terms"].tolist())}
+            index.offsets = data["offsets"]
+            index.docs = data["docs"]
+            index.weights = data["weights"]
+            index.idf = data["idf"]
+        return index
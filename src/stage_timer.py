@@ -0,0 +1,39 @@
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Callable, Any
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+class StageTimer:
+    """Duración (segundos) de las etapas de una consulta; las etapas pueden correr en otros hilos"""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.durations[name] = time.perf_counter() - start
+
+    def run(self, name: str, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta function(*args) midiendo su duración como la etapa `name`"""
+        with self.stage(name):
+            return function(*args, **kwargs)
+
+    def overlap(self, parallel_stage: str, *stages: str) -> float:
+        """Tiempo que ahorra correr `stages` en paralelo: su suma menos la duración de `parallel_stage`"""
+        saved = max(0.0, sum(self.durations.get(stage, 0.0) for stage in stages) - self.durations.get(parallel_stage, 0.0))
+        self.durations["critical_path_saved"] = saved
+        return saved
+
+    def format(self) -> str:
+        return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.durations.items())
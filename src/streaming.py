@@ -0,0 +1,63 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional
+
+# Agregar el directorio raíz al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+_DONE = object()
+
+class DeltaRecorder:
+    """Reenvía los fragmentos de texto a `on_delta` y registra cuándo llegó el primero"""
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self.on_delta = on_delta
+        self.started_at = time.perf_counter()
+        self.first_text: Optional[float] = None  # Segundos desde el inicio de la consulta
+
+    def __call__(self, text: str):
+        if not text:
+            return
+        if self.first_text is None:
+            self.first_text = time.perf_counter() - self.started_at
+        self.on_delta(text)
+
+class QueryStream:
+    """Respuesta del agente como iterador asíncrono de fragmentos de texto.
+
+    `run(on_delta)` es el procesamiento síncrono de la consulta (clientes de los
+    SDK y búsqueda); corre en un hilo y cada fragmento que entrega a on_delta llega
+    al bucle de eventos por una cola. Al terminar la iteración, `result` tiene lo
+    que retornó run (el QueryResult).
+    """
+
+    def __init__(self, run: Callable[[Callable[[str], None]], Any]):
+        self._run = run
+        self.result: Any = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Any]" = asyncio.Queue()
+
+        def on_delta(text: str):
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        def worker():
+            try:
+                return self._run(on_delta)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+        task = asyncio.ensure_future(asyncio.to_thread(worker))
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+
+        self.result = await task
@@ -1,10 +1,15 @@
 import sys
+import time
 import asyncio
+import threading
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 import json
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import numpy as np
+from telegram import Update, Message, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter, TelegramError
 from telegram.ext import (
     Application, 
     CommandHandler, 
@@ -22,14 +27,121 @@ sys.path.append(str(Path(__file__).parent.parent))
 from config.settings import settings
 from src.openai_agent import OpenAIAgent
 
+def _retry_seconds(error: RetryAfter) -> float:
+    """Espera pedida por Telegram (entero o timedelta según la versión de python-telegram-bot)"""
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+class ProgressiveMessage:
+    """Mensaje de Telegram que se edita a medida que llega la respuesta del agente.
+    
+    Telegram limita las ediciones por chat: entre una edición y la siguiente pasan
+    al menos TELEGRAM_EDIT_INTERVAL segundos (o lo que pida un RetryAfter), y los
+    fragmentos que llegan mientras tanto se acumulan para la próxima. Si Telegram
+    rechaza una edición, se deja de editar y la respuesta final va en un mensaje nuevo.
+    """
+    
+    CURSOR = " ▌"
+    
+    def __init__(self, message: Message, started_at: float, interval: Optional[float] = None):
+        self.message = message
+        self.started_at = started_at
+        self.interval = settings.TELEGRAM_EDIT_INTERVAL if interval is None else interval
+        self.text = ""
+        self.shown = ""
+        self.next_edit_at = 0.0
+        self.edits = 0
+        self.editable = True
+        self.first_visible: Optional[float] = None  # Segundos hasta la primera edición con texto de la respuesta
+    
+    async def append(self, delta: str):
+        self.text += delta
+        if not self.editable or time.perf_counter() < self.next_edit_at:
+            return
+        
+        try:
+            await self._edit(self._preview())
+        except TelegramError as e:
+            # El mensaje ya no se puede editar (o la red falló): seguir acumulando la respuesta
+            self.editable = False
+            logger.warning(f"Telegram rechazó la edición parcial ({e}); la respuesta se enviará al final")
+    
+    def _preview(self) -> str:
+        """Texto parcial, sin formato (el Markdown incompleto no se puede interpretar), recortado al límite"""
+        limit = settings.MAX_MESSAGE_LENGTH - len(self.CURSOR)
+        text = self.text if len(self.text) <= limit else self.text[:limit - 1] + "…"
+        return text + self.CURSOR
+    
+    async def _edit(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        """Edita el mensaje; False si Telegram pidió esperar"""
+        if text == self.shown and parse_mode is None:
+            return True
+        
+        try:
+            await self.message.edit_text(text, parse_mode=parse_mode)
+        except RetryAfter as e:
+            self.next_edit_at = time.perf_counter() + _retry_seconds(e)
+            return False
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        
+        self.shown = text
+        self.edits += 1
+        self.next_edit_at = time.perf_counter() + self.interval
+        if self.first_visible is None:
+            self.first_visible = time.perf_counter() - self.started_at
+        return True
+    
+    async def finish(self, text: str):
+        """Reemplaza el texto parcial por la respuesta final con formato; lo que no cabe va en mensajes nuevos"""
+        limit = settings.MAX_MESSAGE_LENGTH
+        parts = [text[i:i+4000] for i in range(0, len(text), 4000)] if len(text) > limit else [text]
+        
+        if await self._final_edit(parts[0]):
+            parts = parts[1:]
+        else:
+            # La respuesta parcial queda como está: la final va completa en mensajes nuevos
+            logger.warning("No se pudo editar el mensaje con la respuesta final; se envía en un mensaje nuevo")
+        
+        for part in parts:
+            try:
+                await self.message.reply_text(part, parse_mode=ParseMode.MARKDOWN)
+            except BadRequest:
+                await self.message.reply_text(part)
+    
+    async def _final_edit(self, text: str) -> bool:
+        """Última edición, con formato si Telegram lo puede interpretar; False si no se logró"""
+        if not self.editable:
+            return False
+        
+        # La última edición no se puede omitir: esperar lo que pida Telegram
+        for _ in range(3):
+            try:
+                if await self._edit(text, parse_mode=ParseMode.MARKDOWN):
+                    return True
+            except BadRequest:
+                # Markdown que Telegram no puede interpretar: mostrar el texto sin formato
+                try:
+                    if await self._edit(text):
+                        return True
+                except TelegramError:
+                    return False
+            except TelegramError:
+                return False
+            await asyncio.sleep(max(0.0, self.next_edit_at - time.perf_counter()))
+        return False
+
 class TelegramBot:
     def __init__(self):
         if not settings.TELEGRAM_BOT_TOKEN:
             raise ValueError("TELEGRAM_BOT_TOKEN no configurado. Revisa tu archivo .env")
             
-        self.application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+        # Actualizaciones concurrentes: las consultas de varios usuarios se procesan a la vez
+        self.application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).concurrent_updates(True).build()
         self.agent = OpenAIAgent()
         self.user_sessions = {}  # Cache de sesiones de usuario
+        self.first_text_latencies = deque(maxlen=1000)  # Segundos hasta el primer texto visible de cada respuesta
         
         # Configurar handlers
         self.setup_handlers()
@@ -199,6 +311,8 @@ _"¿Cómo se calculan los aportes?"_
         
         # Estadísticas del vector store
         vector_stats = self.agent.vector_store.get_statistics()
+        cache_stats = self.agent.answer_cache.stats()
+        first_text = f"{np.percentile(self.first_text_latencies, 50):.1f}s" if self.first_text_latencies else "N/A"
         
         stats_message = f"""
 📊 **ESTADÍSTICAS**
@@ -211,6 +325,8 @@ _"¿Cómo se calculan los aportes?"_
 • Total documentos indexados: {vector_stats.get('total_documents', 'N/A')}
 • Artículos disponibles: {vector_stats.get('articles_count', 'N/A')}
 • Secciones adicionales: {vector_stats.get('sections_count', 'N/A')}
+• Respuestas en caché: {cache_stats['size']} ({cache_stats['hit_rate']:.0%} de aciertos)
+• Primer texto visible (mediana): {first_text}
 
 **Sistema:**
 • Motor de IA: OpenAI GPT-3.5
@@ -255,12 +371,24 @@ _"¿Cómo se calculan los aportes?"_
         
         logger.info(f"Consulta de {user.first_name} ({user.id}): {query_text}")
         
-        # Mostrar que el bot está escribiendo
-        await update.message.reply_chat_action(ChatAction.TYPING)
+        started_at = time.perf_counter()
+        progress = None
         
         try:
-            # Procesar consulta con el agente
-            result = self.agent.process_query(query_text)
+            if settings.TELEGRAM_STREAMING:
+                # Mensaje provisional que se edita a medida que el agente genera la respuesta
+                placeholder = await update.message.reply_text("⏳ Consultando la Ley 2381 de 2024...")
+                progress = ProgressiveMessage(placeholder, started_at)
+                stream = self.agent.stream_query(query_text)
+                async for delta in stream:
+                    await progress.append(delta)
+                result = stream.result
+            else:
+                # Mostrar que el bot está escribiendo
+                await update.message.reply_chat_action(ChatAction.TYPING)
+                
+                # Procesar consulta con el agente en un hilo, sin bloquear el bucle de eventos
+                result = await asyncio.to_thread(self.agent.process_query, query_text)
             
             # Preparar respuesta
             response_text = result.response
@@ -275,18 +403,28 @@ _"¿Cómo se calculan los aportes?"_
                     response_text += f"\n\n📚 **Referencias consultadas:**\n" + "\n".join(source_list)
             
             # Agregar tiempo de procesamiento
-            response_text += f"\n\n⏱️ _Procesado en {result.processing_time:.1f}s_"
+            cached = " (respuesta en caché)" if result.cache_hit else ""
+            response_text += f"\n\n⏱️ _Procesado en {result.processing_time:.1f}s{cached}_"
             
+            if progress is not None:
+                await progress.finish(response_text)
+                first_visible = progress.first_visible
             # Verificar límite de caracteres de Telegram
-            if len(response_text) > 4096:
+            elif len(response_text) > 4096:
                 # Dividir mensaje largo
                 parts = [response_text[i:i+4000] for i in range(0, len(response_text), 4000)]
                 for part in parts:
                     await update.message.reply_text(part, parse_mode=ParseMode.MARKDOWN)
+                first_visible = time.perf_counter() - started_at
             else:
                 await update.message.reply_text(response_text, parse_mode=ParseMode.MARKDOWN)
+                first_visible = time.perf_counter() - started_at
             
             logger.info(f"Respuesta enviada a {user.first_name}. Fuentes: {len(result.sources)}")
+            if first_visible is not None:
+                self.first_text_latencies.append(first_visible)
+                edits = f" ({progress.edits} ediciones)" if progress is not None else ""
+                logger.info(f"Primer texto visible en {first_visible:.2f}s{edits}")
             
         except Exception as e:
             error_message = f"""
@@ -300,7 +438,10 @@ Lo siento, ocurrió un error inesperado. Por favor:
 _Error: {str(e)}_
             """
             
-            await update.message.reply_text(error_message, parse_mode=ParseMode.MARKDOWN)
+            if progress is not None:
+                await progress.finish(error_message)
+            else:
+                await update.message.reply_text(error_message, parse_mode=ParseMode.MARKDOWN)
             logger.error(f"Error procesando consulta de {user.first_name}: {e}")
     
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -322,6 +463,9 @@ _Error: {str(e)}_
             logger.info("🤖 Iniciando bot de Telegram...")
             logger.info(f"Bot configurado para Ley 2381 de 2024")
             
+            # Cargar el modelo de embeddings en segundo plano mientras el bot empieza a recibir mensajes
+            threading.Thread(target=self.agent.vector_store.warmup, name="embedding-warmup", daemon=True).start()
+            
             # Ejecutar bot
             self.application.run_polling(
                 allowed_updates=Update.ALL_TYPES,
@@ -1,10 +1,14 @@
 import json
 import sys
+import time
+import hashlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Any, Tuple, Optional, Callable
+import threading
+import numpy as np
 from loguru import logger
 import uuid
 
@@ -12,31 +16,623 @@ import uuid
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.settings import settings
+from src.corpus_store import CompactCorpus, file_hash
+from src.chunker import ArticleChunker
+from src.cache import LRUCache, normalize_query
+from src.sparse_index import BM25Index
+from src.index_artifact import IndexArtifact
+from src.quantization import QuantizedEmbeddings, QUANTIZATION_MODES, spill
+from src.batching_encoder import MicroBatchingEncoder
+from src.reranker import CrossEncoderReranker
+from src.article_references import ArticleIndex
+
+COLLECTION_NAME = "ley_2381_2024"
+# Distancia coseno: 1 - distancia es la similitud, como en los motores numpy y artifact
+COLLECTION_METADATA = {"description": "Ley 2381 de 2024 - Sistema de Protección Social", "hnsw:space": "cosine"}
+
+def cosine_similarity(result: Dict[str, Any]) -> Optional[float]:
+    """Similitud coseno de un resultado con la consulta.
+
+    En la búsqueda híbrida `similarity_score` es la puntuación RRF (solo sirve para
+    ordenar) y la similitud está en `dense_score`: None si solo lo encontró BM25.
+    """
+    return result['dense_score'] if 'dense_score' in result else result.get('similarity_score')
+
+def corpus_hash(documents: List[Dict[str, Any]]) -> str:
+    """Hash del contenido indexado, independiente del orden de los documentos"""
+    digest = hashlib.sha256()
+    for doc in sorted(documents, key=lambda doc: doc['id']):
+        digest.update(doc['id'].encode('utf-8') + b"\0" + doc['content'].encode('utf-8') + b"\0")
+    return digest.hexdigest()
+
+def document_hash(doc: Dict[str, Any]) -> str:
+    """Hash de lo que determina el embedding y los metadatos de un documento.
+
+    Incluye el modelo de embeddings: cambiarlo invalida todos los documentos.
+    """
+    metadata = {key: value for key, value in doc['metadata'].items() if key != 'content_hash'}
+    payload = json.dumps([settings.EMBEDDING_MODEL, doc['content'], metadata], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class RetrievalBackend:
+    """Interfaz de los motores de búsqueda por similitud.
+
+    `query` retorna el mismo formato que Chroma (listas por consulta de ids,
+    documents, metadatas y distances), con distancias donde 1 - distancia es la
+    similitud coseno, así que LawVectorStore formatea igual los resultados de cualquier motor.
+    """
+
+    name = "base"
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def add(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]):
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]):
+        """Agrega los documentos o reemplaza los que ya existen con el mismo ID"""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def query(self, query_embeddings: List[List[float]], n_results: int) -> Dict[str, List[List[Any]]]:
+        raise NotImplementedError
+
+    def get(self, ids: List[str]) -> Dict[str, List[Any]]:
+        """Documentos y metadatos de los IDs existentes"""
+        raise NotImplementedError
+
+    def documents(self) -> Dict[str, List[Any]]:
+        """IDs, textos y metadatos de todos los documentos"""
+        raise NotImplementedError
+
+    def content_hashes(self) -> Dict[str, Optional[str]]:
+        """Hash de contenido guardado en los metadatos de cada documento, por ID"""
+        raise NotImplementedError
+
+    def reload(self):
+        """Vuelve a leer el estado tras reiniciar la colección"""
+
+    def statistics(self) -> Optional[Dict[str, Any]]:
+        """Instantánea de estadísticas precalculada por el motor, si la trae"""
+        return None
+
+class ChromaBackend(RetrievalBackend):
+    """Búsqueda aproximada (HNSW) directamente sobre la colección de Chroma"""
+
+    name = "chroma"
+
+    def __init__(self, get_collection: Callable[[], Any]):
+        # La colección se resuelve en cada llamada porque reset_vector_store la reemplaza
+        self._get_collection = get_collection
+
+    @property
+    def collection(self):
+        return self._get_collection()
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]):
+        self.collection.add(embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids)
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]):
+        self.collection.upsert(embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=ids)
+
+    def query(self, query_embeddings: List[List[float]], n_results: int) -> Dict[str, List[List[Any]]]:
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            include=['documents', 'metadatas', 'distances']
+        )
+
+    def get(self, ids: List[str]) -> Dict[str, List[Any]]:
+        return self.collection.get(ids=ids, include=['documents', 'metadatas'])
+
+    def documents(self) -> Dict[str, List[Any]]:
+        return self.collection.get(limit=self.count(), include=['documents', 'metadatas'])
+
+    def content_hashes(self) -> Dict[str, Optional[str]]:
+        stored = self.collection.get(limit=self.count(), include=['metadatas'])
+        return {doc_id: metadata.get('content_hash') for doc_id, metadata in zip(stored['ids'], stored['metadatas'])}
+
+    def get_all(self) -> Dict[str, List[Any]]:
+        """Todo el contenido de la colección, incluidos los embeddings"""
+        return self.collection.get(limit=self.count(), include=['embeddings', 'documents', 'metadatas'])
+
+class NumpyBackend(RetrievalBackend):
+    """Búsqueda exacta por similitud coseno sobre una matriz en memoria.
+
+    Con un corpus de unos pocos miles de fragmentos, un producto matriz-vector
+    sobre embeddings normalizados es exacto y más rápido que recorrer el grafo
+    HNSW. Si recibe un ChromaBackend, carga su contenido al iniciar y escribe
+    también en él, de modo que Chroma sigue siendo el almacenamiento persistente.
+
+    Con cuantización (int8 o binary) solo los códigos compactos quedan en memoria
+    residente: eligen una lista corta que se reordena con los embeddings float,
+    guardados en un archivo temporal mapeado en memoria.
+    """
+
+    name = "numpy"
+
+    def __init__(self, source: Optional[ChromaBackend] = None, quantization: Optional[str] = None):
+        self.source = source
+        self.quantization = quantization or settings.EMBEDDING_QUANTIZATION
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Modo de cuantización desconocido: {self.quantization} (opciones: {', '.join(QUANTIZATION_MODES)})")
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            self._ids: List[str] = []
+            self._documents: List[str] = []
+            self._metadatas: List[Dict[str, Any]] = []
+            self._positions: Dict[str, int] = {}
+            self._matrix: Optional[np.ndarray] = None
+            self._codes: Optional[QuantizedEmbeddings] = None
+            self._pending: List[np.ndarray] = []
+
+        if self.source is not None and self.source.count() > 0:
+            data = self.source.get_all()
+            self._append(data['ids'], data['embeddings'], data['metadatas'], data['documents'])
+            logger.info(f"Índice NumPy cargado desde Chroma: {len(self._ids)} documentos")
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _store_floats(self, matrix: np.ndarray) -> np.ndarray:
+        return spill(matrix)
+
+    def _encode(self, matrix: Optional[np.ndarray]) -> Tuple[Optional[np.ndarray], Optional[QuantizedEmbeddings]]:
+        """Matriz float a conservar y sus códigos, si la cuantización está activa"""
+        if self.quantization == "none" or matrix is None or len(matrix) == 0:
+            return matrix, None
+        return self._store_floats(matrix), QuantizedEmbeddings.build(matrix, self.quantization)
+
+    def _append(self, ids, embeddings, metadatas, documents):
+        with self._lock:
+            for doc_id in ids:
+                self._positions[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+            self._documents.extend(documents)
+            self._metadatas.extend(metadatas)
+            # Los lotes se concatenan en la siguiente consulta, no en cada inserción
+            self._pending.append(self._normalize(embeddings))
+
+    def _snapshot(self) -> Tuple[Optional[np.ndarray], Optional[QuantizedEmbeddings], List[str], List[str], List[Dict[str, Any]]]:
+        """Matriz y listas coherentes entre sí para una consulta.
+
+        Las inserciones solo extienden las listas y `_replace` publica listas nuevas,
+        así que una consulta en curso nunca ve filas de un estado distinto.
+        """
+        with self._lock:
+            if self._pending:
+                blocks = ([self._matrix] if self._matrix is not None else []) + self._pending
+                self._matrix, self._codes = self._encode(np.concatenate(blocks) if len(blocks) > 1 else blocks[0])
+                self._pending = []
+            return self._matrix, self._codes, self._ids, self._documents, self._metadatas
+
+    def _replace(self, removed: set, ids, embeddings, metadatas, documents):
+        """Publica un estado nuevo sin los IDs `removed` y con los documentos dados al final.
+
+        Supone un único escritor (la indexación); las consultas siguen usando el
+        estado anterior hasta que se publica el nuevo.
+        """
+        matrix, _, current_ids, current_documents, current_metadatas = self._snapshot()
+        keep = [row for row, doc_id in enumerate(current_ids) if doc_id not in removed]
+
+        blocks = [matrix[keep]] if matrix is not None else []
+        if ids:
+            blocks.append(self._normalize(embeddings))
+
+        new_ids = [current_ids[row] for row in keep] + list(ids)
+        new_matrix, new_codes = self._encode(np.concatenate(blocks) if blocks else None)
+        new_state = {
+            '_ids': new_ids,
+            '_documents': [current_documents[row] for row in keep] + list(documents),
+            '_metadatas': [current_metadatas[row] for row in keep] + list(metadatas),
+            '_positions': {doc_id: position for position, doc_id in enumerate(new_ids)},
+            '_matrix': new_matrix,
+            '_codes': new_codes,
+            '_pending': []
+        }
+        with self._lock:
+            self.__dict__.update(new_state)
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def embedding_bytes(self) -> int:
+        """Bytes de embeddings en memoria residente; los float mapeados desde disco no cuentan"""
+        matrix, codes, _, _, _ = self._snapshot()
+        if codes is not None:
+            return codes.nbytes
+        return matrix.nbytes if matrix is not None else 0
+
+    def add(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]):
+        if self.source is not None:
+            self.source.add(ids, embeddings, metadatas, documents)
+        self._append(ids, embeddings, metadatas, documents)
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]):
+        if self.source is not None:
+            self.source.upsert(ids, embeddings, metadatas, documents)
+        self._replace(set(ids), ids, embeddings, metadatas, documents)
+
+    def delete(self, ids: List[str]):
+        if self.source is not None:
+            self.source.delete(ids)
+        self._replace(set(ids), [], [], [], [])
+
+    def query(self, query_embeddings: List[List[float]], n_results: int) -> Dict[str, List[List[Any]]]:
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        matrix, codes, ids, documents, metadatas = self._snapshot()
+        if matrix is None or matrix.shape[0] == 0:
+            return results
+
+        queries = self._normalize(query_embeddings)
+        if codes is None:
+            candidates = None
+            scores = queries @ matrix.T
+        else:
+            # Lista corta por los códigos y puntuación exacta con los float de esas filas
+            candidates = codes.shortlist(queries, max(n_results, settings.QUANTIZED_SHORTLIST))
+            scores = np.einsum('qd,qmd->qm', queries, matrix[candidates])
+        k = min(n_results, scores.shape[1])
+
+        # Selección parcial de los k mejores y orden solo entre ellos
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        if candidates is not None:
+            top = np.take_along_axis(candidates, top, axis=1)
+
+        for rows, row_scores in zip(top.tolist(), top_scores.tolist()):
+            results['ids'].append([ids[row] for row in rows])
+            results['documents'].append([documents[row] for row in rows])
+            results['metadatas'].append([metadatas[row] for row in rows])
+            results['distances'].append([1 - score for score in row_scores])
+        return results
+
+    def get(self, ids: List[str]) -> Dict[str, List[Any]]:
+        with self._lock:
+            rows = [self._positions[doc_id] for doc_id in ids if doc_id in self._positions]
+            return {
+                'ids': [self._ids[row] for row in rows],
+                'documents': [self._documents[row] for row in rows],
+                'metadatas': [self._metadatas[row] for row in rows]
+            }
+
+    def documents(self) -> Dict[str, List[Any]]:
+        return {'ids': list(self._ids), 'documents': list(self._documents), 'metadatas': list(self._metadatas)}
+
+    def content_hashes(self) -> Dict[str, Optional[str]]:
+        return {doc_id: metadata.get('content_hash') for doc_id, metadata in zip(self._ids, self._metadatas)}
+
+class ArtifactBackend(NumpyBackend):
+    """Búsqueda exacta sobre un artefacto de índice precompilado, de solo lectura.
+
+    La matriz es la del mmap del artefacto (ya normalizada), así que el arranque
+    no genera embeddings ni abre ChromaDB. Para cambiar el índice hay que
+    reconstruir el artefacto con python -m src.index_artifact.
+    """
+
+    name = "artifact"
+
+    def __init__(self, artifact: IndexArtifact, quantization: Optional[str] = None):
+        self.artifact = artifact
+        super().__init__(source=None, quantization=quantization)
+
+    def reload(self):
+        with self._lock:
+            self._ids = self.artifact.ids
+            self._documents = self.artifact.documents
+            self._metadatas = self.artifact.metadatas
+            self._positions = {doc_id: position for position, doc_id in enumerate(self._ids)}
+            self._matrix, self._codes = self._encode(self.artifact.embeddings)
+            self._pending = []
+        logger.info(f"Índice cargado desde el artefacto {self.artifact.path.name}: {len(self._ids)} documentos")
+
+    def _store_floats(self, matrix: np.ndarray) -> np.ndarray:
+        # Ya está mapeada desde el artefacto
+        return matrix
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError("El artefacto de índice es de solo lectura: reconstrúyelo con python -m src.index_artifact")
+
+    add = upsert = delete = _read_only
+
+    def statistics(self) -> Optional[Dict[str, Any]]:
+        return dict(self.artifact.manifest['statistics'])
+
+    def check_model(self, model):
+        """Rechaza un modelo cuyos embeddings no tienen la dimensión del artefacto"""
+        dimensions = model.get_sentence_embedding_dimension()
+        if dimensions != self.artifact.manifest['dimensions']:
+            raise ValueError(
+                f"El modelo genera embeddings de {dimensions} dimensiones y el artefacto "
+                f"tiene {self.artifact.manifest['dimensions']}"
+            )
 
 class LawVectorStore:
-    def __init__(self):
-        self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+    """Vector store de la ley sobre ChromaDB.
+    
+    El modelo de embeddings (y torch) se carga en el primer uso o con warmup(); con
+    QUERY_ENCODER=onnx las consultas se codifican con ONNX Runtime y torch solo se
+    carga si hay que indexar. En modo ligero no se abre ChromaDB ni se carga el
+    modelo: solo se sirven artículos desde el corpus compacto con
+    get_article_by_number. Con el motor "artifact" tampoco se abre ChromaDB: el
+    índice se lee del artefacto precompilado.
+    """
+    
+    def __init__(self, lightweight: Optional[bool] = None, retrieval_backend: Optional[str] = None):
+        self.lightweight = settings.LIGHTWEIGHT_MODE if lightweight is None else lightweight
+        self.retrieval_backend = (retrieval_backend or settings.RETRIEVAL_BACKEND).lower()
+        self.startup_timings: Dict[str, float] = {}
+        self._embedding_model = None
+        self._query_encoder = None
+        self._article_index: Optional[ArticleIndex] = None
+        self._model_lock = threading.Lock()
+        self.chunker = ArticleChunker()
+        self.query_cache = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE, settings.QUERY_EMBEDDING_CACHE_TTL)
         self.client = None
         self.collection = None
-        self.setup_chroma()
+        self.backend: Optional[RetrievalBackend] = None
+        self.sparse_index: Optional[BM25Index] = None
+        self.reranker = CrossEncoderReranker() if settings.RERANK_ENABLED and not self.lightweight else None
+        
+        if self.lightweight:
+            self.index_stats = self._read_statistics() or {'total_documents': 0}
+            logger.info("Modo ligero: sin modelo de embeddings ni ChromaDB, solo consulta de artículos")
+            return
+        
+        if self.retrieval_backend != "artifact":
+            self.setup_chroma()
+        with self._timed("index_load"):
+            self.backend = self.create_backend(self.retrieval_backend)
+            self.index_stats = self.load_statistics()
+            if settings.SEARCH_MODE == "hybrid":
+                self.sparse_index = self.load_sparse_index()
+        
+        chunked = self.index_stats.get('chunks_count', 0) > 0
+        if self.index_stats['total_documents'] and chunked != settings.CHUNKING_ENABLED:
+            logger.warning(
+                f"El índice {'está' if chunked else 'no está'} fragmentado pero CHUNKING_ENABLED={settings.CHUNKING_ENABLED}; "
+                f"reindexa para que las búsquedas y las actualizaciones sean consistentes"
+            )
+        
+        logger.info(f"Vector store listo en {self.format_startup_report()}")
+    
+    @contextmanager
+    def _timed(self, stage: str):
+        """Registra la duración de una etapa de arranque en startup_timings"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[stage] = time.perf_counter() - start
+    
+    @property
+    def embedding_model(self):
+        """Modelo de embeddings; se importa y carga en el primer uso"""
+        if self._embedding_model is None:
+            if self.lightweight:
+                raise RuntimeError("Modo ligero: el modelo de embeddings no está disponible")
+            
+            with self._model_lock:
+                if self._embedding_model is None:
+                    with self._timed("model_import"):
+                        from sentence_transformers import SentenceTransformer
+                    with self._timed("model_load"):
+                        model = SentenceTransformer(settings.EMBEDDING_MODEL)
+                    if isinstance(self.backend, ArtifactBackend):
+                        self.backend.check_model(model)
+                    self._embedding_model = model
+                    logger.info(f"Modelo de embeddings cargado en {self.startup_timings['model_load']:.2f}s")
+        
+        return self._embedding_model
+    
+    @property
+    def query_encoder(self):
+        """Encoder de las consultas: el modelo de torch o, con QUERY_ENCODER=onnx, su exportación a ONNX.
+        
+        Con QUERY_BATCHING se envuelve en un MicroBatchingEncoder que agrupa las consultas concurrentes.
+        """
+        if self._query_encoder is None:
+            if self.lightweight:
+                raise RuntimeError("Modo ligero: el modelo de embeddings no está disponible")
+            
+            # Fuera del candado: embedding_model lo toma al cargar el modelo
+            encoder = self.embedding_model if settings.QUERY_ENCODER != "onnx" else None
+            
+            with self._model_lock:
+                if self._query_encoder is None:
+                    if encoder is None:
+                        with self._timed("query_encoder_load"):
+                            from src.query_encoder import OnnxQueryEncoder
+                            encoder = OnnxQueryEncoder()
+                        if isinstance(self.backend, ArtifactBackend):
+                            self.backend.check_model(encoder)
+                        logger.info(f"Encoder ONNX de consultas cargado: {encoder.model_path.name}")
+                    
+                    self._query_encoder = MicroBatchingEncoder(encoder) if settings.QUERY_BATCHING else encoder
+        
+        return self._query_encoder
+    
+    def warmup(self) -> Dict[str, float]:
+        """Carga el encoder de consultas y ejecuta una codificación de prueba para que la primera consulta no pague la inicialización"""
+        self.article_index
+        encoder = self.query_encoder
+        with self._timed("warmup"):
+            encoder.encode(["pensión de vejez"], show_progress_bar=False)
+        
+        if self.reranker is not None:
+            with self._timed("reranker_load"):
+                self.reranker.model.predict([("pensión de vejez", "pensión de vejez")], show_progress_bar=False)
+        
+        logger.info(f"Calentamiento completado: {self.format_startup_report()}")
+        return self.startup_report()
+    
+    def startup_report(self) -> Dict[str, float]:
+        """Duración (s) de cada etapa de arranque: importaciones, apertura de la base, índices y modelo"""
+        report = {stage: round(seconds, 3) for stage, seconds in self.startup_timings.items()}
+        report['total'] = round(sum(self.startup_timings.values()), 3)
+        return report
+    
+    def format_startup_report(self) -> str:
+        return ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in self.startup_report().items())
+    
+    def create_backend(self, name: str) -> RetrievalBackend:
+        """Crea el motor de búsqueda configurado en RETRIEVAL_BACKEND"""
+        if name == "artifact":
+            return ArtifactBackend(IndexArtifact(settings.INDEX_ARTIFACT_PATH))
+        
+        chroma = ChromaBackend(lambda: self.collection)
+        if name == "chroma":
+            return chroma
+        if name == "numpy":
+            return NumpyBackend(source=chroma)
+        raise ValueError(f"Motor de búsqueda desconocido: {name} (opciones: chroma, numpy, artifact)")
+    
+    def load_sparse_index(self) -> Optional[BM25Index]:
+        """Carga el índice BM25 guardado; si falta o no corresponde a la colección, lo reconstruye"""
+        path = settings.BM25_INDEX_PATH
+        if path.exists():
+            try:
+                index = BM25Index.load(path)
+                indexed = [{'id': doc_id, 'content': text} for doc_id, text in zip(index.ids, index.texts)]
+                if corpus_hash(indexed) == self.index_stats.get('corpus_hash'):
+                    return index
+                logger.info("Índice BM25 desactualizado respecto a la colección, reconstruyendo...")
+            except Exception as e:
+                logger.warning(f"No se pudo cargar el índice BM25: {e}")
+        
+        if self.index_stats['total_documents'] == 0:
+            return None
+        return self.rebuild_sparse_index()
+    
+    def rebuild_sparse_index(self, documents: Optional[List[Dict[str, Any]]] = None) -> BM25Index:
+        """Construye y guarda el índice BM25 de los documentos dados o de toda la colección"""
+        if documents is None:
+            documents = self._stored_documents()
+        
+        ids = [doc['id'] for doc in documents]
+        texts = [doc['content'] for doc in documents]
+        metadatas = [doc['metadata'] for doc in documents]
+        
+        self.sparse_index = BM25Index().build(ids, texts, metadatas)
+        self.sparse_index.save(settings.BM25_INDEX_PATH)
+        return self.sparse_index
+    
+    def _stored_documents(self) -> List[Dict[str, Any]]:
+        """Todos los documentos de la colección (lectura completa, solo al construir índices)"""
+        stored = self.backend.documents()
+        return [
+            {'id': doc_id, 'content': content, 'metadata': metadata}
+            for doc_id, content, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        ]
+    
+    def load_statistics(self) -> Dict[str, Any]:
+        """Carga la instantánea de estadísticas; si falta o no corresponde a la colección, la recalcula.
+        
+        Es la única lectura de bookkeeping en SQLite (un count() al iniciar): búsquedas y
+        /stats usan la instantánea en memoria. Un artefacto de índice trae la suya.
+        """
+        snapshot = self.backend.statistics()
+        if snapshot is not None:
+            return snapshot
+        
+        count = self.backend.count()
+        snapshot = self._read_statistics()
+        
+        if snapshot is not None:
+            if snapshot.get('total_documents') == count:
+                return snapshot
+            logger.info("Estadísticas del índice desactualizadas respecto a la colección, recalculando...")
+        
+        return self.build_statistics(self._stored_documents() if count else [])
+    
+    def _read_statistics(self) -> Optional[Dict[str, Any]]:
+        """Lee la instantánea guardada, sin verificarla contra la colección"""
+        if not settings.INDEX_STATS_PATH.exists():
+            return None
+        
+        try:
+            with open(settings.INDEX_STATS_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"No se pudieron cargar las estadísticas del índice: {e}")
+            return None
+    
+    def build_statistics(self, documents: List[Dict[str, Any]], build_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Calcula y guarda la instantánea de estadísticas de los documentos indexados"""
+        counts_by_type = Counter(doc['metadata']['type'] for doc in documents)
+        article_numbers = {doc['metadata']['article_number'] for doc in documents if doc['metadata']['type'] in ('article', 'chunk')}
+        
+        snapshot = {
+            'total_documents': len(documents),
+            'articles_count': len(article_numbers),
+            'chunks_count': counts_by_type.get('chunk', 0),
+            'sections_count': sum(count for doc_type, count in counts_by_type.items() if doc_type not in ('article', 'chunk')),
+            'counts_by_type': dict(counts_by_type),
+            'collection_name': COLLECTION_NAME,
+            'embedding_model': settings.EMBEDDING_MODEL,
+            'corpus_hash': corpus_hash(documents),
+            'built_at': datetime.now().isoformat(timespec='seconds') if build_seconds is not None else None,
+            'build_seconds': round(build_seconds, 3) if build_seconds is not None else None
+        }
         
+        # Escritura atómica para no dejar una instantánea a medias
+        tmp_path = settings.INDEX_STATS_PATH.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(settings.INDEX_STATS_PATH)
+        
+        self.index_stats = snapshot
+        return snapshot
+    
+    def finish_indexing(self, documents: Optional[List[Dict[str, Any]]] = None, build_seconds: Optional[float] = None):
+        """Reconstruye el índice BM25 y la instantánea de estadísticas tras indexar"""
+        if documents is None:
+            documents = self._stored_documents()
+        self.rebuild_sparse_index(documents)
+        self.build_statistics(documents, build_seconds)
+        if self.reranker is not None:
+            self.reranker.clear()
+        self._article_index = None
+    
     def setup_chroma(self):
         """Configura ChromaDB"""
         try:
-            # Configurar ChromaDB para persistencia
-            self.client = chromadb.PersistentClient(
-                path=str(settings.VECTOR_DB_PATH),
-                settings=ChromaSettings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
+            with self._timed("chromadb_import"):
+                import chromadb
+                from chromadb.config import Settings as ChromaSettings
             
-            # Crear o obtener colección
-            self.collection = self.client.get_or_create_collection(
-                name="ley_2381_2024",
-                metadata={"description": "Ley 2381 de 2024 - Sistema de Protección Social"}
-            )
+            with self._timed("db_open"):
+                # Configurar ChromaDB para persistencia
+                self.client = chromadb.PersistentClient(
+                    path=str(settings.VECTOR_DB_PATH),
+                    settings=ChromaSettings(
+                        anonymized_telemetry=False,
+                        allow_reset=True
+                    )
+                )
+                
+                # Crear o obtener colección
+                self.collection = self._open_collection()
             
             logger.info("ChromaDB configurado exitosamente")
             
@@ -44,14 +640,76 @@ class LawVectorStore:
             logger.error(f"Error configurando ChromaDB: {e}")
             raise
     
-    def load_processed_data(self) -> Dict[str, Any]:
-        """Carga los datos procesados del PDF"""
-        processed_file = settings.PROCESSED_DATA_DIR / "processed_law.json"
+    def _open_collection(self, create: bool = False):
+        """Abre (o crea) la colección sin función de embeddings propia de Chroma.
+        
+        Todos los embeddings, de documentos y de consultas, los genera
+        self.embedding_model, así que Chroma nunca carga su modelo por defecto.
+        """
+        factory = self.client.create_collection if create else self.client.get_or_create_collection
+        collection = factory(name=COLLECTION_NAME, metadata=COLLECTION_METADATA, embedding_function=None)
+        
+        # Chroma conserva la distancia con la que se creó la colección (l2 por defecto)
+        if (collection.metadata or {}).get("hnsw:space", "l2") != "cosine":
+            collection = self._migrate_to_cosine(collection)
+        return collection
+    
+    def _migrate_to_cosine(self, collection):
+        """Copia una colección creada con distancia l2 a una con distancia coseno.
+        
+        Con l2 sobre embeddings sin normalizar, 1 - distancia no es una similitud. Se
+        reutilizan los embeddings guardados, así que no hace falta el modelo; la
+        colección original solo se elimina cuando la copia está completa.
+        """
+        logger.info(f"Migrando la colección {collection.name} a distancia coseno...")
+        stored = collection.get(limit=collection.count(), include=['embeddings', 'documents', 'metadatas'])
+        
+        staging_name = f"{COLLECTION_NAME}_cosine"
+        if staging_name in [existing.name for existing in self.client.list_collections()]:
+            self.client.delete_collection(staging_name)
+        staging = self.client.create_collection(name=staging_name, metadata=COLLECTION_METADATA, embedding_function=None)
+        if stored['ids']:
+            staging.add(ids=stored['ids'], embeddings=stored['embeddings'], documents=stored['documents'], metadatas=stored['metadatas'])
+        
+        self.client.delete_collection(COLLECTION_NAME)
+        staging.modify(name=COLLECTION_NAME)
+        logger.info(f"Colección migrada a distancia coseno: {len(stored['ids'])} documentos")
+        return self.client.get_collection(name=COLLECTION_NAME, embedding_function=None)
+    
+    def load_processed_data(self, corpus: Optional[str] = None) -> Dict[str, Any]:
+        """Carga los datos procesados: la ley (processed_law) o el corpus combinado de batch_ingest.
+        
+        `corpus` es "law" o "combined"; por defecto, INDEX_CORPUS.
+        """
+        corpus = (corpus or settings.INDEX_CORPUS).lower()
+        if corpus == "law":
+            processed_file, corpus_file = settings.PROCESSED_DATA_DIR / "processed_law.json", settings.CORPUS_PATH
+            command, regenerate = "python -m src.pdf_processor", "python -m src.corpus_store"
+        elif corpus == "combined":
+            processed_file, corpus_file = settings.COMBINED_CORPUS_JSON, settings.COMBINED_CORPUS_PATH
+            command = regenerate = "python -m src.batch_ingest"
+        else:
+            raise ValueError(f"Corpus desconocido: {corpus} (opciones: law, combined)")
+        
+        # Preferir el corpus compacto si se generó a partir del JSON actual (por contenido, no por fecha)
+        if corpus_file.exists():
+            try:
+                with CompactCorpus(corpus_file) as compact:
+                    current = not processed_file.exists() or compact.source_hash == file_hash(processed_file)
+                    data = compact.to_processed_data() if current else None
+            except ValueError as e:
+                logger.warning(f"Corpus compacto no utilizable: {e}")
+                data = None
+            
+            if data is not None:
+                logger.info(f"Datos cargados del corpus compacto: {data['metadata']['total_articles']} artículos")
+                return data
+            logger.warning(f"El corpus compacto no corresponde a {processed_file.name}; se usa el JSON (regenéralo con: {regenerate})")
         
         if not processed_file.exists():
             raise FileNotFoundError(
                 f"Archivo procesado no encontrado: {processed_file}. "
-                "Ejecuta primero: python -m src.pdf_processor"
+                f"Ejecuta primero: {command}"
             )
         
         with open(processed_file, 'r', encoding='utf-8') as f:
@@ -64,47 +722,83 @@ class LawVectorStore:
         """Prepara los documentos para indexación"""
         documents = []
         
-        # Procesar artículos
+        # Procesar artículos (en fragmentos si la fragmentación está activa)
         for article in data['articles']:
+            documents.extend(self.prepare_item_documents(article))
+        
+        # Procesar secciones (capítulos, títulos)
+        for section in data['sections']:
+            documents.extend(self.prepare_item_documents(section))
+        
+        logger.info(f"Preparados {len(documents)} documentos para indexación")
+        return documents
+    
+    def prepare_item_documents(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Documentos indexables de un artículo o sección; los artículos se fragmentan si está activo"""
+        if item['type'] == 'article' and settings.CHUNKING_ENABLED:
+            return [self.prepare_document(chunk) for chunk in self.chunker.chunk_article(item)]
+        return [self.prepare_document(item)]
+    
+    def prepare_document(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte un artículo, fragmento o sección segmentada en un documento indexable"""
+        if item['type'] == 'chunk':
             doc = {
-                'id': f"article_{article['article_number']}",
-                'content': article['content'],
+                'id': f"article_{item['article_number']}_chunk_{item['chunk_index']}",
+                'content': item['content'],
+                'type': 'chunk',
+                'article_number': item['article_number'],
+                'metadata': {
+                    'article_number': item['article_number'],
+                    'type': 'chunk',
+                    'chunk_index': item['chunk_index'],
+                    'units': item['units'],
+                    'length': len(item['content'])
+                }
+            }
+        elif item['type'] == 'article':
+            doc = {
+                'id': f"article_{item['article_number']}",
+                'content': item['content'],
                 'type': 'article',
-                'article_number': article['article_number'],
+                'article_number': item['article_number'],
                 'metadata': {
-                    'article_number': article['article_number'],
+                    'article_number': item['article_number'],
                     'type': 'article',
-                    'length': len(article['content'])
+                    'length': len(item['content'])
                 }
             }
-            documents.append(doc)
-        
-        # Procesar secciones (capítulos, títulos)
-        for i, section in enumerate(data['sections']):
+        else:
             doc = {
-                'id': f"section_{section['type']}_{section['section_number']}",
-                'content': section['content'],
-                'type': section['type'],
-                'section_number': section['section_number'],
+                'id': f"section_{item['type']}_{item['section_number']}",
+                'content': item['content'],
+                'type': item['type'],
+                'section_number': item['section_number'],
                 'metadata': {
-                    'section_number': section['section_number'],
-                    'type': section['type'],
-                    'length': len(section['content'])
+                    'section_number': item['section_number'],
+                    'type': item['type'],
+                    'length': len(item['content'])
                 }
             }
-            documents.append(doc)
         
-        logger.info(f"Preparados {len(documents)} documentos para indexación")
-        return documents
+        # Documentos de otras normas: ID con espacio de nombres para no colisionar con la ley principal
+        source = item.get('source')
+        if source:
+            doc['metadata']['source'] = source
+            if source != settings.PRIMARY_SOURCE:
+                doc['id'] = f"{source}:{doc['id']}"
+        
+        # Permite reindexar solo lo que cambió
+        doc['metadata']['content_hash'] = document_hash(doc)
+        return doc
     
-    def create_embeddings(self, documents: List[Dict[str, Any]]) -> Tuple[List[str], List[List[float]], List[Dict]]:
+    def create_embeddings(self, documents: List[Dict[str, Any]], show_progress_bar: bool = True) -> Tuple[List[str], List[List[float]], List[Dict], List[str]]:
         """Crea embeddings para los documentos"""
         texts = [doc['content'] for doc in documents]
         ids = [doc['id'] for doc in documents]
         metadatas = [doc['metadata'] for doc in documents]
         
         logger.info("Generando embeddings...")
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=True)
+        embeddings = self.embedding_model.encode(texts, show_progress_bar=show_progress_bar)
         
         # Convertir a lista de listas (requerido por ChromaDB)
         embeddings_list = [embedding.tolist() for embedding in embeddings]
@@ -115,90 +809,204 @@ class LawVectorStore:
         """Elimina completamente el vector store para empezar de cero"""
         try:
             logger.info("Eliminando vector store existente...")
-            self.client.delete_collection("ley_2381_2024")
-            self.collection = self.client.create_collection(
-                name="ley_2381_2024",
-                metadata={"description": "Ley 2381 de 2024 - Sistema de Protección Social"}
-            )
+            self.client.delete_collection(COLLECTION_NAME)
+            self.collection = self._open_collection(create=True)
             logger.info("Vector store reiniciado exitosamente")
         except Exception as e:
             logger.warning(f"No se pudo eliminar la colección existente: {e}")
             # Crear nueva colección
-            self.collection = self.client.get_or_create_collection(
-                name="ley_2381_2024",
-                metadata={"description": "Ley 2381 de 2024 - Sistema de Protección Social"}
-            )
-    def index_documents(self, force_reindex: bool = False):
-        """Indexa todos los documentos en el vector store"""
+            self.collection = self._open_collection()
+        self.backend.reload()
+        self.build_statistics([])
+    
+    def index_documents(self, force_reindex: bool = False) -> Optional[Dict[str, Any]]:
+        """Indexa todos los documentos en el vector store.
+        
+        Con force_reindex=True sobre una colección existente no se vacía nada: se
+        actualiza de forma incremental (ver update_index).
+        """
         try:
             # Verificar si ya existe contenido
-            count = self.collection.count()
+            count = self.backend.count()
             if count > 0 and not force_reindex:
                 logger.info(f"Vector store ya contiene {count} documentos. Use force_reindex=True para reindexar.")
-                return
-            
-            if force_reindex and count > 0:
-                self.reset_vector_store()
-            
-            # Cargar y preparar datos
-            data = self.load_processed_data()
-            documents = self.prepare_documents(data)
-            
-            # Verificar IDs únicos antes de indexar
-            ids_set = set()
-            unique_documents = []
-            
-            for doc in documents:
-                if doc['id'] not in ids_set:
-                    ids_set.add(doc['id'])
-                    unique_documents.append(doc)
-                else:
-                    logger.warning(f"ID duplicado encontrado y omitido: {doc['id']}")
-            
-            logger.info(f"Documentos únicos a indexar: {len(unique_documents)}")
-            
-            # Crear embeddings
-            ids, embeddings, metadatas, texts = self.create_embeddings(unique_documents)
-            
-            # Indexar en ChromaDB
-            logger.info("Indexando documentos en ChromaDB...")
-            self.collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids
-            )
+                return None
             
-            final_count = self.collection.count()
-            logger.info(f"✅ Indexación completada. Total de documentos: {final_count}")
+            return self.update_index()
             
         except Exception as e:
             logger.error(f"Error en indexación: {e}")
             raise
     
-    def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Busca documentos relevantes usando similitud semántica"""
+    def _unique_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Verifica IDs únicos antes de indexar, conservando la primera aparición"""
+        ids_set = set()
+        unique_documents = []
+        
+        for doc in documents:
+            if doc['id'] not in ids_set:
+                ids_set.add(doc['id'])
+                unique_documents.append(doc)
+            else:
+                logger.warning(f"ID duplicado encontrado y omitido: {doc['id']}")
+        
+        logger.info(f"Documentos únicos a indexar: {len(unique_documents)}")
+        return unique_documents
+    
+    def update_index(self, documents: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Sincroniza la colección con los datos procesados comparando el hash de cada documento.
+        
+        Solo se generan embeddings de los documentos nuevos o modificados (upsert) y se
+        eliminan los que ya no existen. La colección nunca se vacía: las consultas se
+        siguen respondiendo con los datos anteriores mientras tanto.
+        """
+        start_time = time.perf_counter()
+        
+        if documents is None:
+            # Cargar y preparar datos
+            documents = self._unique_documents(self.prepare_documents(self.load_processed_data()))
+        
+        stored = self.backend.content_hashes()
+        current_ids = {doc['id'] for doc in documents}
+        
+        added = [doc for doc in documents if doc['id'] not in stored]
+        updated = [doc for doc in documents if doc['id'] in stored and stored[doc['id']] != doc['metadata']['content_hash']]
+        removed = [doc_id for doc_id in stored if doc_id not in current_ids]
+        
+        if added or updated:
+            self.upsert_documents(added + updated)
+        if removed:
+            logger.info(f"Eliminando {len(removed)} documentos que ya no existen...")
+            self.backend.delete(removed)
+        
+        if added or updated or removed or self.index_stats['corpus_hash'] != corpus_hash(documents):
+            self.finish_indexing(documents, time.perf_counter() - start_time)
+        
+        report = {
+            'added': [doc['id'] for doc in added],
+            'updated': [doc['id'] for doc in updated],
+            'removed': removed,
+            'unchanged': len(documents) - len(added) - len(updated),
+            'total_documents': self.index_stats['total_documents'],
+            'seconds': round(time.perf_counter() - start_time, 3)
+        }
+        
+        logger.info(
+            f"✅ Indexación completada: {len(added)} nuevos, {len(updated)} modificados, "
+            f"{len(removed)} eliminados, {report['unchanged']} sin cambios. "
+            f"Total de documentos: {report['total_documents']}"
+        )
+        return report
+    
+    def add_documents(self, documents: List[Dict[str, Any]], show_progress_bar: bool = True):
+        """Genera los embeddings de un lote de documentos y los agrega a la colección"""
+        ids, embeddings, metadatas, texts = self.create_embeddings(documents, show_progress_bar=show_progress_bar)
+        
+        logger.info(f"Indexando {len(ids)} documentos ({self.backend.name})...")
+        self.backend.add(ids, embeddings, metadatas, texts)
+    
+    def upsert_documents(self, documents: List[Dict[str, Any]], show_progress_bar: bool = True):
+        """Genera los embeddings de un lote de documentos y los agrega o reemplaza en la colección"""
+        ids, embeddings, metadatas, texts = self.create_embeddings(documents, show_progress_bar=show_progress_bar)
+        
+        logger.info(f"Actualizando {len(ids)} documentos ({self.backend.name})...")
+        self.backend.upsert(ids, embeddings, metadatas, texts)
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding de la consulta con el modelo del proyecto, cacheado por texto normalizado"""
+        return self.embed_queries([query])[0]
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embeddings de varias consultas; las que no están en caché se codifican en una sola pasada.
+        
+        La caché se indexa por el texto normalizado, pero se codifica el texto original
+        de la primera consulta con esa clave (el modelo distingue mayúsculas y signos).
+        """
+        keys = [normalize_query(query) for query in queries]
+        originals: Dict[str, str] = {}
+        for key, query in zip(keys, queries):
+            originals.setdefault(key, query)
+        embeddings = {key: self.query_cache.get(key) for key in dict.fromkeys(keys)}
+        
+        missing = [key for key, embedding in embeddings.items() if embedding is None]
+        if missing:
+            texts = [originals[key] for key in missing]
+            for key, embedding in zip(missing, self.query_encoder.encode(texts, show_progress_bar=False)):
+                embeddings[key] = embedding.tolist()
+                self.query_cache.put(key, embeddings[key])
+        
+        return [embeddings[key] for key in keys]
+    
+    def _format_results(self, results: Dict[str, Any], query_index: int = 0) -> List[Dict[str, Any]]:
+        """Convierte la respuesta del motor para una consulta en la lista de resultados"""
+        formatted_results = []
+        for i in range(len(results['documents'][query_index])):
+            distance = results['distances'][query_index][i]
+            formatted_results.append({
+                'id': results['ids'][query_index][i],
+                'content': results['documents'][query_index][i],
+                'metadata': results['metadatas'][query_index][i],
+                'similarity_score': 1 - distance,  # Distancia coseno a similitud
+                'distance': distance
+            })
+        return formatted_results
+    
+    def _query(self, queries: List[str], n_results: int, mode: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """Resultados por consulta, densos o híbridos según `mode` (por defecto SEARCH_MODE)"""
+        hybrid = (mode or settings.SEARCH_MODE) == "hybrid" and self.sparse_index is not None
+        depth = max(n_results, settings.HYBRID_CANDIDATES) if hybrid else n_results
+        
+        # Buscar documentos similares con el mismo modelo usado para indexar
+        results = self.backend.query(self.embed_queries(queries), depth)
+        dense = [self._format_results(results, query_index) for query_index in range(len(queries))]
+        
+        if not hybrid:
+            return dense
+        return [self._fuse(query, ranking, n_results) for query, ranking in zip(queries, dense)]
+    
+    def _fuse(self, query: str, dense: List[Dict[str, Any]], n_results: int) -> List[Dict[str, Any]]:
+        """Combina el ranking denso y el BM25 con reciprocal rank fusion.
+        
+        `similarity_score` pasa a ser la puntuación RRF normalizada (1.0 = primero en
+        ambos rankings); la similitud coseno y la puntuación BM25 quedan en
+        `dense_score` y `sparse_score`.
+        """
+        k = settings.RRF_K
+        fused: Dict[str, Dict[str, Any]] = {}
+        
+        for rank, result in enumerate(dense, 1):
+            result['dense_score'] = result['similarity_score']
+            result['sparse_score'] = 0.0
+            result['rrf_score'] = 1 / (k + rank)
+            fused[result['id']] = result
+        
+        for rank, (doc_id, score) in enumerate(self.sparse_index.search(query, max(len(dense), n_results)), 1):
+            result = fused.get(doc_id)
+            if result is None:
+                result = fused[doc_id] = {'id': doc_id, 'content': None, 'distance': None, 'dense_score': None, 'rrf_score': 0.0}
+            result['sparse_score'] = score
+            result['rrf_score'] += 1 / (k + rank)
+        
+        ranked = sorted(fused.values(), key=lambda result: result['rrf_score'], reverse=True)[:n_results]
+        for result in ranked:
+            if result['content'] is None:
+                # Documento que solo encontró BM25: el índice guarda su texto y metadatos
+                result['content'], result['metadata'] = self.sparse_index.document(result['id'])
+            result['similarity_score'] = result['rrf_score'] * (k + 1) / 2
+        return ranked
+    
+    def _check_searchable(self):
+        if self.lightweight:
+            raise RuntimeError("Modo ligero: la búsqueda requiere el modelo de embeddings y ChromaDB")
+        if self.index_stats['total_documents'] == 0:
+            raise ValueError("Vector store vacío. Ejecuta index_documents() primero.")
+    
+    def search(self, query: str, n_results: int = 5, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca documentos relevantes: semántica o híbrida (BM25 + semántica) según `mode`"""
         try:
-            if self.collection.count() == 0:
-                raise ValueError("Vector store vacío. Ejecuta index_documents() primero.")
+            self._check_searchable()
             
-            # Buscar documentos similares
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
-            )
-            
-            # Formatear resultados
-            formatted_results = []
-            for i in range(len(results['documents'][0])):
-                result = {
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'similarity_score': 1 - results['distances'][0][i],  # Convertir distancia a similitud
-                    'distance': results['distances'][0][i]
-                }
-                formatted_results.append(result)
+            formatted_results = self._query([query], n_results, mode)[0]
             
             logger.info(f"Búsqueda completada. Encontrados {len(formatted_results)} resultados para: '{query}'")
             return formatted_results
@@ -207,55 +1015,116 @@ class LawVectorStore:
             logger.error(f"Error en búsqueda: {e}")
             raise
     
-    def get_article_by_number(self, article_number: str) -> Dict[str, Any]:
-        """Obtiene un artículo específico por su número"""
+    def search_many(self, queries: List[str], n_results: int = 5, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Busca varias consultas con una sola codificación y una sola consulta al motor.
+        
+        Los resultados se combinan conservando, por documento, la mayor similitud, y
+        se retornan ordenados por relevancia (hasta n_results por consulta).
+        """
         try:
-            results = self.collection.get(
-                ids=[f"article_{article_number}"],
-                include=['documents', 'metadatas']
-            )
+            # Consultas únicas tras normalizar, en el orden recibido
+            unique: Dict[str, str] = {}
+            for query in queries:
+                unique.setdefault(normalize_query(query), query)
+            unique_queries = list(unique.values())
+            if not unique_queries:
+                return []
             
-            if not results['documents']:
-                return None
+            self._check_searchable()
             
-            return {
-                'content': results['documents'][0],
-                'metadata': results['metadatas'][0]
-            }
+            rankings = self._query(unique_queries, n_results, mode)
+            for query, ranking in zip(unique_queries, rankings):
+                for result in ranking:
+                    result['matched_query'] = query
+            
+            merged = self.merge_rankings(rankings)
+            
+            logger.info(f"Búsqueda múltiple completada. {len(merged)} resultados únicos para {len(unique_queries)} consultas")
+            return merged
             
+        except Exception as e:
+            logger.error(f"Error en búsqueda múltiple: {e}")
+            raise
+    
+    @staticmethod
+    def merge_rankings(rankings: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Combina varios rankings conservando, por documento, la mayor similitud; ordenados por relevancia"""
+        best: Dict[str, Dict[str, Any]] = {}
+        for ranking in rankings:
+            for result in ranking:
+                current = best.get(result['id'])
+                if current is None or result['similarity_score'] > current['similarity_score']:
+                    best[result['id']] = result
+        
+        return sorted(best.values(), key=lambda result: result['similarity_score'], reverse=True)
+    
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Deja los resultados de mayor confianza según el cross-encoder (RERANK_ENABLED); sin él, los top_k primeros"""
+        if self.reranker is None:
+            return results[:top_k or settings.RERANK_TOP_K]
+        return self.reranker.rerank(query, results, top_k)
+    
+    @property
+    def article_index(self) -> ArticleIndex:
+        """Índice en memoria de artículos por número, construido con los datos procesados en el primer uso"""
+        if self._article_index is None:
+            with self._timed("article_index_load"):
+                try:
+                    articles = self.load_processed_data()['articles']
+                except FileNotFoundError as e:
+                    logger.warning(f"Índice de artículos vacío: {e}")
+                    articles = []
+                self._article_index = ArticleIndex(articles)
+            logger.info(f"Índice de artículos listo: {len(self._article_index)} artículos")
+        return self._article_index
+    
+    def get_article_by_number(self, article_number: str) -> Dict[str, Any]:
+        """Obtiene un artículo específico por su número"""
+        try:
+            return self.article_index.get(article_number)
         except Exception as e:
             logger.error(f"Error obteniendo artículo {article_number}: {e}")
             return None
     
+    def get_articles(self, article_numbers: List[str]) -> List[Dict[str, Any]]:
+        """Los artículos existentes entre los números dados, en el mismo orden"""
+        articles = (self.article_index.get(number) for number in article_numbers)
+        return [article for article in articles if article is not None]
+    
     def get_statistics(self) -> Dict[str, Any]:
-        """Obtiene estadísticas del vector store"""
-        try:
-            total_docs = self.collection.count()
-            
-            # Obtener muestra para análisis
-            sample = self.collection.get(limit=total_docs, include=['metadatas'])
-            
-            articles_count = sum(1 for meta in sample['metadatas'] if meta['type'] == 'article')
-            sections_count = total_docs - articles_count
-            
-            return {
-                'total_documents': total_docs,
-                'articles_count': articles_count,
-                'sections_count': sections_count,
-                'collection_name': self.collection.name
-            }
-            
-        except Exception as e:
-            logger.error(f"Error obteniendo estadísticas: {e}")
-            return {}
+        """Obtiene estadísticas del vector store desde la instantánea en memoria, sin leer la colección"""
+        return {
+            **self.index_stats,
+            'retrieval_backend': self.backend.name if self.backend else None,
+            'embedding_quantization': getattr(self.backend, 'quantization', None),
+            'query_encoder': settings.QUERY_ENCODER,
+            'query_batching': self._query_encoder.stats() if isinstance(self._query_encoder, MicroBatchingEncoder) else None,
+            'search_mode': settings.SEARCH_MODE,
+            'lightweight': self.lightweight,
+            'startup_seconds': self.startup_report(),
+            'query_cache': self.query_cache.stats(),
+            'reranker': self.reranker.stats() if self.reranker is not None else None
+        }
 
 def main():
     """Función principal para testing"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Indexa la ley en el vector store y prueba una búsqueda")
+    parser.add_argument("--reindex", action="store_true", help="Actualiza de forma incremental una colección existente")
+    args = parser.parse_args()
+    
     vector_store = LawVectorStore()
     
     try:
         print("🔄 Iniciando indexación...")
-        vector_store.index_documents()
+        report = vector_store.index_documents(force_reindex=args.reindex)
+        
+        if report:
+            print(f"   Nuevos: {len(report['added'])}, modificados: {len(report['updated'])}, "
+                  f"eliminados: {len(report['removed'])}, sin cambios: {report['unchanged']} ({report['seconds']}s)")
+            for doc_id in report['updated']:
+                print(f"   ✏️  {doc_id}")
         
         print("\n📊 Estadísticas del vector store:")
         stats = vector_store.get_statistics()
@@ -268,12 +1137,14 @@ def main():
         
         print(f"\nResultados para '{query}':")
         for i, result in enumerate(results, 1):
-            print(f"\n{i}. Similarity: {result['similarity_score']:.3f}")
+            similarity = cosine_similarity(result)
+            print(f"\n{i}. Similitud: {f'{similarity:.3f}' if similarity is not None else 'solo BM25'}")
             print(f"   Tipo: {result['metadata']['type']}")
-            if result['metadata']['type'] == 'article':
+            if result['metadata']['type'] in ('article', 'chunk'):
                 print(f"   Artículo: {result['metadata']['article_number']}")
             print(f"   Contenido: {result['content'][:200]}...")
         
+        print(f"\n⏱️  Arranque: {vector_store.format_startup_report()}")
         print("\n✅ Vector store funcionando correctamente!")
         
     except Exception as e: